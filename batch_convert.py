@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversión por lotes con ffmpeg (webm -> mp4, m4a -> mp3/wav).
+
+Recorre archivos y carpetas (con --recursive, también subcarpetas) y lanza
+varios ffmpeg a la vez: --jobs procesos, cada uno con -threads igual a los
+núcleos repartidos entre ellos. Por defecto el audio va a un proceso por
+núcleo (los encoders de audio usan un solo hilo) y el vídeo a un proceso por
+cada VIDEO_THREADS núcleos.
+
+Un manifiesto JSON guarda, para cada salida, el tamaño y la fecha del
+original y el perfil con que se convirtió: un archivo se salta solo si la
+salida existe y el original no ha cambiado. Cada salida se escribe a un
+temporal y se renombra al acabar, así una conversión interrumpida nunca
+cuenta como hecha.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from file_utils import atomic_output
+
+MANIFEST_NAME = ".batch_convert.json"
+VIDEO_THREADS = 4
+# el manifiesto se reescribe como mucho cada tantos segundos (y al final)
+MANIFEST_SAVE_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class Profile:
+    exts: tuple[str, ...]
+    suffix: str
+    args: tuple[str, ...]
+    video: bool = False
+
+
+PROFILES = {
+    "webm2mp4": Profile((".webm",), ".mp4", ("-c:v", "libx264", "-c:a", "aac"), video=True),
+    "m4a2mp3": Profile((".m4a",), ".mp3", ("-codec:a", "libmp3lame", "-q:a", "2")),
+    "m4a2wav": Profile((".m4a",), ".wav", ()),
+}
+
+
+def default_jobs(profile: Profile, cpus: int | None = None) -> int:
+    cpus = cpus or os.cpu_count() or 1
+    return max(1, cpus // VIDEO_THREADS) if profile.video else cpus
+
+
+def ffmpeg_cmd(profile: Profile, src: Path, dst: Path, threads: int = 0) -> list[str]:
+    return ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-i", str(src), "-threads", str(threads), *profile.args, str(dst)]
+
+
+def convert_one(profile: Profile, src: Path, dst: Path, threads: int = 0) -> None:
+    """Convierte `src` a `dst` (vía temporal); error de ffmpeg -> RuntimeError."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_output(dst) as tmp:
+        p = subprocess.run(ffmpeg_cmd(profile, src, tmp, threads),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if p.returncode != 0:
+            raise RuntimeError(p.stderr.strip().splitlines()[-1] if p.stderr.strip()
+                               else f"ffmpeg falló (code={p.returncode})")
+
+
+def find_inputs(paths: list[Path], exts: tuple[str, ...], recursive: bool = False) -> list[tuple[Path, Path]]:
+    """(raíz, archivo) de cada entrada con extensión `exts`, en orden y sin repetir."""
+    found, seen = [], set()
+    for root in map(Path, paths):
+        if root.is_file():
+            files = [root] if root.suffix.lower() in exts else []
+            root = root.parent
+        elif root.is_dir():
+            pattern = root.rglob("*") if recursive else root.glob("*")
+            files = sorted(p for p in pattern if p.is_file() and p.suffix.lower() in exts)
+        else:
+            raise FileNotFoundError(f"No existe: {root}")
+        for f in files:
+            if f.resolve() not in seen:
+                seen.add(f.resolve())
+                found.append((root, f))
+    return found
+
+
+def output_path(profile: Profile, root: Path, src: Path, out_dir: Path | None = None) -> Path:
+    """Junto al original, o en `out_dir` con la misma estructura de carpetas."""
+    if out_dir is None:
+        return src.with_suffix(profile.suffix)
+    return (Path(out_dir) / src.relative_to(root)).with_suffix(profile.suffix)
+
+
+class Manifest:
+    """Salida -> tamaño/fecha del original y perfil de la última conversión correcta."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries = json.loads(self.path.read_text()) if self.path.is_file() else {}
+        self._lock = threading.Lock()
+        self._saved = time.monotonic()
+
+    @staticmethod
+    def _record(profile: Profile, src: Path) -> dict:
+        st = src.stat()
+        return dict(src=str(src.resolve()), size=st.st_size, mtime_ns=st.st_mtime_ns,
+                    args=list(profile.args))
+
+    def up_to_date(self, profile: Profile, src: Path, dst: Path) -> bool:
+        if not dst.exists():
+            return False
+        entry = self.entries.get(str(dst.resolve()))
+        if entry is None:
+            # salida de una versión anterior (sin manifiesto): vale si es más nueva
+            if dst.stat().st_mtime_ns < src.stat().st_mtime_ns:
+                return False
+            self.add(profile, src, dst)
+            return True
+        return entry == self._record(profile, src)
+
+    def add(self, profile: Profile, src: Path, dst: Path) -> None:
+        with self._lock:
+            self.entries[str(dst.resolve())] = self._record(profile, src)
+            if time.monotonic() - self._saved >= MANIFEST_SAVE_INTERVAL:
+                self._save()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.entries, indent=1))
+        os.replace(tmp, self.path)
+        self._saved = time.monotonic()
+
+
+def convert_batch(profile: Profile, paths: list[Path], out_dir: Path | None = None,
+                  recursive: bool = False, jobs: int = 0, threads: int = 0,
+                  force: bool = False, manifest: Path | None = None) -> dict:
+    """
+    Convierte todas las entradas de `paths` con `jobs` ffmpeg en paralelo
+    (0 = según el perfil) y `threads` hilos cada uno (0 = núcleos / jobs).
+    Devuelve el resumen (convertidos, saltados, fallidos, bytes, segundos).
+    """
+    inputs = find_inputs(paths, profile.exts, recursive)
+    cpus = os.cpu_count() or 1
+    jobs = jobs or default_jobs(profile, cpus)
+    threads = threads or max(1, cpus // jobs)
+    if manifest is None:
+        first = Path(paths[0]) if paths else Path(".")
+        manifest = Path(out_dir or (first if first.is_dir() else first.parent)) / MANIFEST_NAME
+    manifest = Manifest(manifest)
+
+    todo = []
+    for root, src in inputs:
+        dst = output_path(profile, root, src, out_dir)
+        if not force and manifest.up_to_date(profile, src, dst):
+            continue
+        todo.append((src, dst))
+    skipped = len(inputs) - len(todo)
+    print(f"[OK] {len(inputs)} archivos: {len(todo)} a convertir, {skipped} al día "
+          f"({jobs} procesos x {threads} hilos)")
+
+    t0 = time.perf_counter()
+    done, failed, nbytes = 0, [], 0
+
+    def run(src, dst):
+        t = time.perf_counter()
+        convert_one(profile, src, dst, threads)
+        manifest.add(profile, src, dst)
+        return time.perf_counter() - t
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(run, src, dst): (src, dst) for src, dst in todo}
+            for fut in as_completed(futures):
+                src, dst = futures[fut]
+                try:
+                    secs = fut.result()
+                except Exception as e:
+                    failed.append(src)
+                    print(f"[WARN] {src}: {e}")
+                    continue
+                done += 1
+                nbytes += src.stat().st_size
+                print(f"[{done + len(failed)}/{len(todo)}] Convertido: {src.name} → "
+                      f"{dst.name} ({secs:.1f}s)")
+    finally:
+        manifest.save()
+
+    elapsed = time.perf_counter() - t0
+    mb = nbytes / 1e6
+    print(f"[OK] {done} convertidos, {skipped} saltados, {len(failed)} con error en "
+          f"{elapsed:.1f}s ({done / max(elapsed, 1e-9):.2f} archivos/s, "
+          f"{mb / max(elapsed, 1e-9):.1f} MB/s de entrada)")
+    return dict(converted=done, skipped=skipped, failed=[str(p) for p in failed],
+                bytes=nbytes, seconds=elapsed)
+
+
+def add_batch_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--recursive", action="store_true", help="Incluye subcarpetas")
+    ap.add_argument("--out-dir", type=Path, default=None,
+                    help="Carpeta de salida (misma estructura); por defecto, junto al original")
+    ap.add_argument("--jobs", type=int, default=0,
+                    help="ffmpeg en paralelo (0 = según núcleos y tipo de conversión)")
+    ap.add_argument("--threads", type=int, default=0,
+                    help="-threads de cada ffmpeg (0 = núcleos / jobs)")
+    ap.add_argument("--force", action="store_true",
+                    help="Convierte aunque la salida esté al día")
+    ap.add_argument("--manifest", type=Path, default=None,
+                    help=f"Manifiesto (por defecto {MANIFEST_NAME} en la carpeta de salida)")
+
+
+def run_from_args(profile: Profile, paths: list[Path], args=None) -> dict:
+    """
+    convert_batch con las opciones de add_batch_args (sin `args`, las de
+    por defecto); error si algo falla.
+    """
+    opts = {k: getattr(args, k, None)
+            for k in ("out_dir", "recursive", "jobs", "threads", "force", "manifest")}
+    stats = convert_batch(profile, paths, out_dir=opts["out_dir"],
+                          recursive=bool(opts["recursive"]), jobs=opts["jobs"] or 0,
+                          threads=opts["threads"] or 0, force=bool(opts["force"]),
+                          manifest=opts["manifest"])
+    if stats["failed"]:
+        raise SystemExit(f"{len(stats['failed'])} archivos con error")
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Convierte archivos en lote con ffmpeg.")
+    ap.add_argument("profile", choices=sorted(PROFILES), help="Tipo de conversión")
+    ap.add_argument("paths", nargs="+", type=Path, help="Archivos o carpetas")
+    add_batch_args(ap)
+    args = ap.parse_args()
+    try:
+        run_from_args(PROFILES[args.profile], args.paths, args)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+# benchmark.py
+"""
+Banc de proves de rendiment dels camins de render, fusió i conversió.
+
+Genera imatges, overlay, vídeo, àudio i webm sintètics (numpy + lavfi
+d'ffmpeg) a un directori de treball i cronometra cada camí en un procés
+propi (fork), per poder-ne mesurar el pic de memòria i l'ús de CPU. El pic
+de memòria és la suma de RSS de tot l'arbre de processos (workers, ffmpeg
+fills), mostrejada cada RSS_SAMPLE_S a /proc. Les sortides dels backends
+ràpids es comparen amb la de referència, el camí original (MoviePy
+write_videofile) per al Ken Burns (PSNR/SSIM amb els filtres d'ffmpeg).
+
+Els resultats es desen en JSON; amb --compare es contrasten amb un JSON
+anterior (p. ex. d'un altre commit).
+
+Ús:
+  python benchmark.py --out bench.json
+  python benchmark.py --resolutions 720p --images 4,16 --only kenburns,overlay
+  python benchmark.py --out nou.json --compare vell.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+# variant -> opcions de render_output (la primera és la referència de qualitat:
+# el camí original, MoviePy write_videofile)
+KENBURNS_VARIANTS = {
+    "moviepy": ["--backend", "moviepy"],
+    "pipe": ["--backend", "pipe"],
+    "batch": ["--backend", "pipe", "--batch", "16"],
+    "workers": ["--backend", "pipe", "--workers", str(os.cpu_count() or 1)],
+    "ffmpeg": ["--backend", "ffmpeg"],
+}
+OVERLAY_VARIANTS = ("python", "ffmpeg")
+REFERENCE_VARIANTS = {"kenburns": next(iter(KENBURNS_VARIANTS)), "overlay": OVERLAY_VARIANTS[0]}
+
+KENBURNS_MODES = ("linear", "pingpong", "tiktok")
+SOURCE_SCALE = 1.5  # imatges sintètiques: 1.5x la resolució de sortida
+AUDIO_SECONDS = 60
+CLIP_SECONDS = 3
+RSS_SAMPLE_S = 0.05
+
+
+def _ffmpeg(*args: str) -> str:
+    p = subprocess.run(["ffmpeg", "-hide_banner", "-y", *args], capture_output=True, text=True)
+    if p.returncode != 0:
+        raise SystemExit(p.stderr.strip() or f"ffmpeg falló (code={p.returncode})")
+    return p.stderr
+
+
+# ---------------------------
+# Entrades sintètiques
+# ---------------------------
+
+def synth_image(path: Path, size: tuple[int, int], seed: int) -> None:
+    """Imatge amb gradients suaus i soroll (detall per al remostreig i l'encoder)."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    low = Image.fromarray(rng.integers(0, 256, (9, 16, 3), dtype=np.uint8))
+    img = np.asarray(low.resize((w, h), Image.BICUBIC), dtype=np.int16)
+    img = img + rng.integers(-12, 13, (h, w, 1), dtype=np.int16)
+    Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+
+def synth_images(work: Path, count: int, out_size: tuple[int, int]) -> Path:
+    """Carpeta amb `count` imatges (JPEG i PNG, horitzontals i verticals)."""
+    w, h = (round(v * SOURCE_SCALE) for v in out_size)
+    folder = work / f"imgs_{out_size[0]}x{out_size[1]}_{count}"
+    if not folder.is_dir():
+        tmp = folder.with_name(folder.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for i in range(count):
+            size = (w, h) if i % 3 else (h, w)
+            synth_image(tmp / f"img_{i:04d}{'.png' if i % 4 == 3 else '.jpg'}", size, i)
+        tmp.rename(folder)
+    return folder
+
+
+def synth_media(work: Path, name: str, *lavfi_and_codec: str) -> Path:
+    path = work / name
+    if not path.exists():
+        tmp = path.with_name(f".tmp_{path.name}")
+        _ffmpeg(*lavfi_and_codec, str(tmp))
+        tmp.replace(path)
+    return path
+
+
+def synth_overlay(work: Path) -> Path:
+    return synth_media(work, "overlay.mp4",
+                       "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=24:duration=2",
+                       "-c:v", "libx264", "-pix_fmt", "yuv420p")
+
+
+def synth_video(work: Path, size: tuple[int, int], fps: float) -> Path:
+    w, h = size
+    return synth_media(work, f"video_{w}x{h}.mp4",
+                       "-f", "lavfi",
+                       "-i", f"testsrc2=size={w}x{h}:rate={fps:g}:duration={CLIP_SECONDS}",
+                       "-c:v", "libx264", "-pix_fmt", "yuv420p")
+
+
+def synth_webm(work: Path, size: tuple[int, int]) -> Path:
+    w, h = size
+    return synth_media(work, f"clip_{w}x{h}.webm",
+                       "-f", "lavfi",
+                       "-i", f"testsrc2=size={w}x{h}:rate=30:duration={CLIP_SECONDS}",
+                       "-f", "lavfi", "-i", f"sine=frequency=440:duration={CLIP_SECONDS}",
+                       "-c:v", "libvpx", "-deadline", "realtime", "-cpu-used", "8",
+                       "-c:a", "libopus", "-shortest")
+
+
+def synth_audio(work: Path) -> Path:
+    return synth_media(work, "audio.m4a",
+                       "-f", "lavfi", "-i", f"sine=frequency=440:duration={AUDIO_SECONDS}",
+                       "-c:a", "aac")
+
+
+# ---------------------------
+# Camins a mesurar
+# ---------------------------
+
+def _output_args(extra: list[str], kenburns: bool = True, overlay: bool = False):
+    from render_output import add_output_args
+
+    ap = argparse.ArgumentParser()
+    add_output_args(ap, kenburns=kenburns, overlay=overlay)
+    return ap.parse_args(extra)
+
+
+def _kenburns_specs(folder: Path, duration: float) -> list[dict]:
+    imgs = sorted(folder.iterdir())
+    return [dict(img_path=p, duration=duration, mode=KENBURNS_MODES[i % len(KENBURNS_MODES)],
+                 z0=1.0 if i % 2 == 0 else 1.2, z1=1.2 if i % 2 == 0 else 1.0)
+            for i, p in enumerate(imgs)]
+
+
+def run_kenburns(variant: str, folder: Path, out: Path, size, fps: float, duration: float):
+    from render_output import write_kenburns
+
+    specs = _kenburns_specs(folder, duration)
+    write_kenburns(specs, out, fps, *size, _output_args(KENBURNS_VARIANTS[variant]))
+    return sum(int(s["duration"] * fps) for s in specs)
+
+
+def run_overlay(variant: str, folder: Path, overlay: Path, out: Path, size, fps: float,
+                duration: float):
+    from ffmpeg_overlay import overlay_writer_args
+    from kenburns_engine import concatenate_clips, ken_burns_clip
+    from make_overlay import blend_with_overlay
+    from render_output import write_video
+
+    specs = _kenburns_specs(folder, duration)
+    base = concatenate_clips([ken_burns_clip(out_w=size[0], out_h=size[1], **s) for s in specs])
+    args = _output_args(["--backend", "pipe", "--batch", "16"], kenburns=False, overlay=True)
+    if variant == "ffmpeg":
+        write_video(base, out, fps, args,
+                    writer_args=overlay_writer_args(overlay, size, fps, mode="screen", opacity=0.9))
+    else:
+        write_video(blend_with_overlay(base, overlay, fps, mode="screen", opacity=0.9),
+                    out, fps, args)
+    return int(base.duration * fps)
+
+
+def run_simple_video(folder: Path, out: Path, size, fps: float, duration: float):
+    script = Path(__file__).with_name("make_simple_video.py")
+    subprocess.run([sys.executable, str(script), "--folder", str(folder), "--out", str(out),
+                    "--time", str(duration), "--fps", str(fps),
+                    "--w", str(size[0]), "--h", str(size[1])], check=True)
+    n_images = sum(1 for p in folder.iterdir() if not p.name.startswith("_"))
+    return int(n_images * duration * fps)
+
+
+def run_extract_frames(video: Path, out_dir: Path):
+    from extract_frames import extract_frames
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    extract_frames(video, out_dir)
+    return sum(1 for _ in out_dir.iterdir())
+
+
+def run_m4a(kind: str, audio: Path, work: Path):
+    src = work / f"conv_{kind}" / audio.name
+    src.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(audio, src)
+    if kind == "mp3":
+        from m4a_2_mp3 import convert_m4a_to_mp3 as convert
+    else:
+        from m4a_2_wav import convert_m4a_to_wav as convert
+    convert(str(src))
+    return None
+
+
+def run_webm(webm: Path, work: Path):
+    from webm2mp4 import convert_folder
+
+    folder = work / "conv_webm"
+    shutil.rmtree(folder, ignore_errors=True)
+    folder.mkdir(parents=True)
+    shutil.copyfile(webm, folder / webm.name)
+    convert_folder(folder)
+    return int(CLIP_SECONDS * 30)
+
+
+# ---------------------------
+# Mesura (un procés per cas)
+# ---------------------------
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + kids.ru_utime + kids.ru_stime
+
+
+def _max_process_rss_mb() -> float:
+    """Pic del procés més gran (ell mateix o un fill), no de la suma."""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux en KiB, macOS en bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _tree_rss_kb(root: int) -> int:
+    """RSS actual (KiB) de `root` i tots els seus descendents, segons /proc."""
+    parents = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", "rb") as f:
+                # el nom (camp 2) pot tenir espais: el ppid va després del ')'
+                parents[int(entry.name)] = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, todo = set(), [root]
+    while todo:
+        pid = todo.pop()
+        tree.add(pid)
+        todo += [p for p, pp in parents.items() if pp == pid and p not in tree]
+    total = 0
+    for pid in tree:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class _TreeRss:
+    """Fil que mostreja el RSS de tot l'arbre de processos i en guarda el pic."""
+
+    def __init__(self):
+        self.available = os.path.isdir("/proc/self")
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while True:
+            self.peak_kb = max(self.peak_kb, _tree_rss_kb(pid))
+            if self._stop.wait(RSS_SAMPLE_S):
+                return
+
+    def __enter__(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.available:
+            self._stop.set()
+            self._thread.join()
+        return False
+
+
+def _child(fn, conn, quiet: bool) -> None:
+    if quiet:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    t0, c0 = time.perf_counter(), _cpu_seconds()
+    result = dict(status="ok", error=None, frames=None)
+    with _TreeRss() as rss:
+        try:
+            result["frames"] = fn()
+        except ImportError as e:
+            result.update(status="skip", error=str(e))
+        except BaseException:
+            result.update(status="error", error=traceback.format_exc(limit=3))
+    result["wall_s"] = time.perf_counter() - t0
+    result["cpu_s"] = _cpu_seconds() - c0
+    result["max_process_rss_mb"] = _max_process_rss_mb()
+    # sense /proc (macOS) només es coneix el pic del procés més gran
+    result["rss_kind"] = "tree" if rss.available else "max_process"
+    result["peak_rss_mb"] = max(rss.peak_kb / 1024, result["max_process_rss_mb"])
+    conn.send(result)
+    conn.close()
+
+
+def measure(fn, quiet: bool = True) -> dict:
+    """Executa `fn` en un procés nou i en retorna temps, CPU i pic de RSS."""
+    if "fork" not in mp.get_all_start_methods():
+        raise SystemExit("El banc de proves necessita fork (Linux/macOS).")
+    ctx = mp.get_context("fork")
+    recv, send = ctx.Pipe(duplex=False)
+    p = ctx.Process(target=_child, args=(fn, send, quiet))
+    p.start()
+    send.close()
+    try:
+        result = recv.recv()
+    except EOFError:
+        result = dict(status="error", error=f"el procés ha acabat (code={p.exitcode})",
+                      frames=None, wall_s=None, cpu_s=None, peak_rss_mb=None,
+                      max_process_rss_mb=None, rss_kind=None)
+    p.join()
+    return result
+
+
+def quality(ref: Path, out: Path) -> tuple[float | None, float | None]:
+    """(PSNR mitjà en dB, SSIM global) de `out` respecte de `ref`."""
+    log = _ffmpeg("-i", str(out), "-i", str(ref), "-lavfi",
+                  "[0:v]split[a][b];[1:v]split[c][d];[a][c]psnr;[b][d]ssim",
+                  "-f", "null", "-")
+    psnr = re.search(r"PSNR .*average:(\S+)", log)
+    ssim = re.search(r"SSIM .*All:(\S+)", log)
+    psnr = float(psnr.group(1)) if psnr else None
+    return (None if psnr is None else min(psnr, 99.0),
+            float(ssim.group(1)) if ssim else None)
+
+
+# ---------------------------
+# Pla i informe
+# ---------------------------
+
+def plan(args, work: Path):
+    """Casos (nom, variant, resolució, imatges, fn, sortida, referència, durada del medi)."""
+    cases = []
+    for res in args.resolutions:
+        size = RESOLUTIONS[res]
+        for n in args.images:
+            folder = synth_images(work, n, size)
+            media_s = n * args.duration
+            ref = None
+            for variant in KENBURNS_VARIANTS:
+                out = work / "out" / f"kenburns_{variant}_{res}_{n}.mp4"
+                cases.append(("kenburns", variant, res, n, out, ref, media_s,
+                              lambda v=variant, o=out, f=folder, s=size:
+                              run_kenburns(v, f, o, s, args.fps, args.duration)))
+                ref = ref or out
+            overlay = synth_overlay(work)
+            ref = None
+            for variant in OVERLAY_VARIANTS:
+                out = work / "out" / f"overlay_{variant}_{res}_{n}.mp4"
+                cases.append(("overlay", variant, res, n, out, ref, media_s,
+                              lambda v=variant, o=out, f=folder, s=size:
+                              run_overlay(v, f, overlay, o, s, args.fps, args.duration)))
+                ref = ref or out
+            out = work / "out" / f"simple_video_{res}_{n}.mp4"
+            cases.append(("simple_video", "ffmpeg", res, n, out, None, media_s,
+                          lambda o=out, f=folder, s=size:
+                          run_simple_video(f, o, s, args.fps, args.duration)))
+
+        video = synth_video(work, size, args.fps)
+        cases.append(("extract_frames", "cv2", res, None, None, None, CLIP_SECONDS,
+                      lambda v=video, r=res: run_extract_frames(v, work / "out" / f"frames_{r}")))
+        webm = synth_webm(work, size)
+        cases.append(("webm2mp4", "libx264", res, None, None, None, CLIP_SECONDS,
+                      lambda w=webm: run_webm(w, work)))
+
+    audio = synth_audio(work)
+    for kind in ("mp3", "wav"):
+        cases.append((f"m4a_2_{kind}", "ffmpeg", None, None, None, None, AUDIO_SECONDS,
+                      lambda k=kind: run_m4a(k, audio, work)))
+
+    if args.only:
+        cases = [c for c in cases
+                 if any(f"{c[0]}/{c[1]}".startswith(o) for o in args.only)]
+    return cases
+
+
+def _key(r: dict) -> tuple:
+    return r["case"], r["variant"], r["resolution"], r["images"]
+
+
+def _label(r: dict) -> str:
+    parts = [f"{r['case']}/{r['variant']}", r["resolution"] or "-"]
+    if r["images"]:
+        parts.append(f"{r['images']} img")
+    return " ".join(parts)
+
+
+def _fmt(value, width: int, spec: str) -> str:
+    return ("-" if value is None else format(value, spec)).rjust(width)
+
+
+def print_table(results: list[dict]) -> None:
+    tree = all(r.get("rss_kind") != "max_process" for r in results)
+    print(f"\n{'cas':<42} {'s':>7} {'fps':>7} {'x real':>7} {'CPU%':>6} "
+          f"{'RSS MB':>7} {'PSNR':>6} {'SSIM':>7}")
+    for r in results:
+        if r["status"] != "ok":
+            print(f"{_label(r):<42} {r['status']}: {(r['error'] or '').splitlines()[-1]}")
+            continue
+        print(f"{_label(r):<42} {r['wall_s']:>7.2f} {_fmt(r['fps'], 7, '.1f')} "
+              f"{r['speed']:>7.1f} {r['cpu_pct']:>6.0f} {r['peak_rss_mb']:>7.0f} "
+              f"{_fmt(r['psnr'], 6, '.1f')} {_fmt(r['ssim'], 7, '.4f')}")
+    print("RSS MB: " + ("pic de la suma de tot l'arbre de processos (mostrejat)" if tree
+                        else "pic del procés més gran (sense /proc no es pot sumar l'arbre)"))
+    refs = sorted({f"{r['case']}/{r['reference']}" for r in results if r.get("reference")})
+    if refs:
+        print("PSNR/SSIM respecte de: " + ", ".join(refs))
+
+
+def compare(results: list[dict], old_path: Path, tolerance: float) -> int:
+    """Compara el temps de cada cas amb un JSON anterior; retorna quants empitjoren."""
+    old = {_key(r): r for r in json.loads(Path(old_path).read_text())["results"]}
+    worse = 0
+    print(f"\nComparació amb {old_path}:")
+    for r in results:
+        prev = old.get(_key(r))
+        if not prev or r["status"] != "ok" or prev["status"] != "ok":
+            continue
+        ratio = prev["wall_s"] / max(r["wall_s"], 1e-9)
+        flag = ""
+        if ratio < 1 - tolerance:
+            flag = "  [WARN] regressió"
+            worse += 1
+        print(f"  {_label(r):<42} {prev['wall_s']:>7.2f}s -> {r['wall_s']:>7.2f}s "
+              f"(x{ratio:.2f}){flag}")
+    return worse
+
+
+def _git_commit() -> str | None:
+    p = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                       cwd=Path(__file__).parent)
+    return p.stdout.strip() or None
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Banc de proves de render, fusió i conversió.")
+    ap.add_argument("--out", default="benchmark.json", help="JSON de resultats")
+    ap.add_argument("--work", default=str(Path(tempfile.gettempdir()) / "benchmark"),
+                    help="Directori de treball (entrades sintètiques i sortides)")
+    ap.add_argument("--resolutions", type=_csv, default=list(RESOLUTIONS),
+                    help=f"Llista separada per comes ({', '.join(RESOLUTIONS)})")
+    ap.add_argument("--images", type=lambda v: [int(x) for x in _csv(v)], default=[4],
+                    help="Nombres d'imatges, separats per comes")
+    ap.add_argument("--duration", type=float, default=2.0, help="Segons per imatge")
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--only", type=_csv, default=None,
+                    help="Només els casos que comencin així (p. ex. kenburns/ffmpeg,overlay)")
+    ap.add_argument("--compare", default=None, help="JSON anterior amb què comparar")
+    ap.add_argument("--tolerance", type=float, default=0.1,
+                    help="Pèrdua de velocitat tolerada a --compare (0.1 = 10%%)")
+    ap.add_argument("--verbose", action="store_true", help="Mostra la sortida de cada cas")
+    args = ap.parse_args()
+
+    unknown = set(args.resolutions) - set(RESOLUTIONS)
+    if unknown:
+        ap.error(f"Resolucions desconegudes: {', '.join(sorted(unknown))}")
+
+    work = Path(args.work)
+    (work / "out").mkdir(parents=True, exist_ok=True)
+    cases = plan(args, work)
+
+    results = []
+    for i, (case, variant, res, n, out, ref, media_s, fn) in enumerate(cases, 1):
+        print(f"[{i}/{len(cases)}] {case}/{variant} {res or ''} {n or ''}".rstrip(), flush=True)
+        r = dict(case=case, variant=variant, resolution=res, images=n, media_s=media_s,
+                 **measure(fn, quiet=not args.verbose))
+        ok = r["status"] == "ok"
+        r["fps"] = r["frames"] / r["wall_s"] if ok and r["frames"] else None
+        r["speed"] = media_s / r["wall_s"] if ok else None
+        r["cpu_pct"] = 100 * r["cpu_s"] / r["wall_s"] if ok else None
+        r["psnr"] = r["ssim"] = None
+        if ok and ref is not None and ref.exists() and out is not None:
+            r["psnr"], r["ssim"] = quality(ref, out)
+            r["reference"] = REFERENCE_VARIANTS[case]
+        results.append(r)
+
+    print_table(results)
+    report = dict(
+        commit=_git_commit(),
+        date=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        platform=platform.platform(),
+        python=platform.python_version(),
+        cpu_count=os.cpu_count(),
+        settings=dict(duration=args.duration, fps=args.fps, source_scale=SOURCE_SCALE),
+        results=results,
+    )
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n[OK] resultats a {args.out}")
+
+    if args.compare and compare(results, Path(args.compare), args.tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# blend_kernels.py
+"""
+Modes de fusió (blend) en aritmètica entera sobre frames uint8.
+
+Tots els modes segueixen la mateixa fórmula que el filtre blend d'ffmpeg:
+
+    out = A + (f(A, B) - A) * opacity
+
+amb A = base, B = overlay. Per a screen i normal coincideix amb el càlcul
+original en float de make_overlay.py (±1 per arrodoniment).
+
+Els càlculs es fan en uint16 sobre buffers preassignats i per franges de
+files, perquè els temporals càpiguen a la cache i no es reservi memòria
+per frame.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+BLEND_MODES = ("normal", "screen", "multiply", "add", "overlay", "soft-light")
+
+
+def _div255(t: np.ndarray, tmp: np.ndarray) -> None:
+    # t <- round(t / 255) in-place; exacte per a 0 <= t <= 65025
+    np.add(t, 128, out=t)
+    np.right_shift(t, 8, out=tmp)
+    np.add(t, tmp, out=t)
+    np.right_shift(t, 8, out=t)
+
+
+def _screen(a, b, t, u):
+    # 255 - (255 - a)(255 - b) / 255
+    np.subtract(255, a, out=t, dtype=np.uint16)
+    np.subtract(255, b, out=u, dtype=np.uint16)
+    np.multiply(t, u, out=t)
+    _div255(t, u)
+    np.subtract(255, t, out=t)
+
+
+def _multiply(a, b, t, u):
+    np.multiply(a, b, out=t, dtype=np.uint16)
+    _div255(t, u)
+
+
+class Blender:
+    """
+    Fusió `mode` amb opacitat `opacity` (0..1). Reutilitzable: els buffers
+    de treball es reserven el primer cop i es mantenen entre crides.
+    """
+
+    def __init__(self, mode: str = "screen", opacity: float = 1.0, rows: int = 32):
+        if mode not in BLEND_MODES:
+            raise ValueError(f"Mode de blend desconegut: {mode}")
+        self.mode = mode
+        self.opacity = min(1.0, max(0.0, opacity))
+        # opacitat en punt fix /256
+        self.weight = int(round(self.opacity * 256))
+        self.rows = rows
+        self._width = None
+
+    def _buffers(self, width: int):
+        if self._width != width:
+            shape = (self.rows, width)
+            self._t = np.empty(shape, dtype=np.uint16)
+            self._u = np.empty(shape, dtype=np.uint16)
+            self._v = np.empty(shape, dtype=np.uint16)
+            self._m = np.empty(shape, dtype=np.uint16)
+            self._width = width
+        return self._t, self._u, self._v, self._m
+
+    def _mode(self, a, b, t, u, v, m):
+        """f(a, b) a `t` (uint16, 0..255)."""
+        if self.mode == "normal":
+            np.copyto(t, b)
+        elif self.mode == "screen":
+            _screen(a, b, t, u)
+        elif self.mode == "multiply":
+            _multiply(a, b, t, u)
+        elif self.mode == "add":
+            # min(a, 255 - b) + b == min(a + b, 255), tot en uint8
+            c = m.view(np.uint8)[:, :a.shape[1]]
+            np.subtract(255, b, out=c)
+            np.minimum(a, c, out=c)
+            np.add(c, b, out=t, dtype=np.uint16)
+        elif self.mode == "overlay":
+            # a < 128: 2ab/255; si no: 255 - 2(255-a)(255-b)/255
+            _multiply(a, b, t, u)
+            np.left_shift(t, 1, out=t)
+            _screen(a, b, v, u)
+            np.left_shift(v, 1, out=v)
+            np.subtract(v, 255, out=v)
+            # t += (v - t)·[a >= 128]; l'aritmètica mòdul 2^16 ho fa exacte
+            np.right_shift(a, 7, out=m, dtype=np.uint16)
+            np.subtract(v, t, out=v)
+            np.multiply(v, m, out=v)
+            np.add(t, v, out=t)
+        else:
+            # soft-light (pegtop): a² + 2b·a(1 - a)
+            np.multiply(a, a, out=t, dtype=np.uint16)
+            _div255(t, u)
+            np.subtract(255, a, out=v, dtype=np.uint16)
+            np.multiply(v, a, out=v)
+            _div255(v, u)
+            np.multiply(v, b, out=v)
+            np.left_shift(v, 1, out=v)
+            _div255(v, u)
+            np.add(t, v, out=t)
+
+    def __call__(self, base: np.ndarray, over: np.ndarray,
+                 out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Fusiona `over` sobre `base` (mateixa forma: un frame o un bloc de
+        frames, uint8). `out` pot ser `base` per treballar in-place.
+        """
+        if out is None:
+            out = np.empty_like(base)
+        width = base.shape[-1] * base.shape[-2]
+        a2 = np.ascontiguousarray(base).reshape(-1, width)
+        b2 = np.ascontiguousarray(over).reshape(-1, width)
+        o2 = out.reshape(-1, width)
+        t, u, v, m = self._buffers(width)
+        w = self.weight
+
+        for r0 in range(0, a2.shape[0], self.rows):
+            a, b, o = a2[r0:r0 + self.rows], b2[r0:r0 + self.rows], o2[r0:r0 + self.rows]
+            n = a.shape[0]
+            tn, un, vn, mn = t[:n], u[:n], v[:n], m[:n]
+
+            self._mode(a, b, tn, un, vn, mn)
+            if w < 256:
+                # (a·(256 - w) + f·w + 128) / 256
+                np.multiply(tn, w, out=tn)
+                np.multiply(a, 256 - w, out=un, dtype=np.uint16)
+                np.add(tn, un, out=tn)
+                np.add(tn, 128, out=tn)
+                np.right_shift(tn, 8, out=tn)
+            np.copyto(o, tn, casting="unsafe")
+        return out
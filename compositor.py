@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# compositor.py
+"""
+Compositor pla per a seqüències llargues de clips amb solapaments.
+
+CompositeVideoClip recorre tots els clips a cada frame (i, niat, tots els
+nivells). Aquí els clips es guarden en un índex d'intervals: els instants
+d'inici/final parteixen la línia de temps en trams amb el mateix conjunt de
+clips actius, i cada frame només en visita els del seu tram (normalment un
+o dos), trobat amb searchsorted. El cost per frame és O(log N + actius).
+
+Els trams on tots els clips visibles són estàtics es marquen al clip
+resultant (static_frames.mark_static).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from moviepy import VideoClip
+from PIL import Image
+
+from profiling import stage
+from static_frames import is_static_during, mark_static
+
+
+def _covers(clip, ct: float, size: tuple[int, int]) -> bool:
+    # clip opac, a (0, 0) i de la mida de sortida: tapa tot el que té a sota
+    return (clip.mask is None and tuple(clip.size) == tuple(size)
+            and tuple(clip.pos(ct)) == (0, 0))
+
+
+def _visible(playing, t: float, size: tuple[int, int]):
+    # només cal compondre des de l'última capa que tapa tot el frame
+    for i in range(len(playing) - 1, -1, -1):
+        if _covers(playing[i], t - playing[i].start, size):
+            return playing[i:]
+    return playing
+
+
+def composite_clips(clips, size: tuple[int, int],
+                    bg_color: tuple[int, int, int] = (0, 0, 0)) -> VideoClip:
+    """
+    Equivalent a CompositeVideoClip(clips, size=size) amb fons opac: mateix
+    ordre de capes (layer_index i després ordre de la llista), posicions,
+    màscares i start/end de cada clip.
+    """
+    clips = sorted(clips, key=lambda c: c.layer_index)
+    ends = [c.end for c in clips]
+    if None in ends:
+        raise ValueError("Tots els clips han de tenir durada")
+
+    # trams [bounds[k], bounds[k + 1]) amb la llista de clips actius (ordre de capa)
+    bounds = np.unique([c.start for c in clips] + ends)
+    active = [[] for _ in range(len(bounds))]
+    for clip in clips:
+        k0 = np.searchsorted(bounds, clip.start)
+        k1 = np.searchsorted(bounds, clip.end)
+        for k in range(k0, k1):
+            active[k].append(clip)
+
+    static = []
+    for k in range(len(bounds) - 1):
+        t0, t1 = float(bounds[k]), float(bounds[k + 1])
+        if all(is_static_during(c, t0 - c.start, t1 - c.start)
+               for c in _visible(active[k], t0, size)):
+            static.append((t0, t1))
+
+    def frame_function(t):
+        k = int(np.searchsorted(bounds, t, side="right")) - 1
+        playing = _visible(active[k], t, size) if k >= 0 else []
+
+        if len(playing) == 1 and _covers(playing[0], t - playing[0].start, size):
+            # com compose_on, els frames float (efectes) es trunquen a uint8
+            return playing[0].get_frame(t - playing[0].start).astype("uint8", copy=False)
+
+        with stage("compose"):
+            img = Image.new("RGB", size, bg_color)
+            for clip in playing:
+                img = clip.compose_on(img, t)
+            frame = np.array(img)
+            return frame[:, :, :3] if frame.shape[2] == 4 else frame
+
+    # sense get_frame(0) al constructor (les imatges es carreguen en diferit)
+    clip = VideoClip(duration=float(max(ends)))
+    clip.frame_function = frame_function
+    clip.size = tuple(size)
+    return mark_static(clip, static)
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from moviepy import ImageClip, CompositeVideoClip
+from moviepy import ImageClip, vfx
+
+from compositor import composite_clips
 
 # --- Configuració ---
 IMATGES = ["img/p001_01.png", "img/p001_02.png", "img/p002_01.png"]
@@ -10,27 +12,25 @@ FADE = 1          # segons de transició
 FPS = 24
 
 # --- Helpers ---
-def crossfade_pair(img1, img2, durada, fade):
-    """Crea un crossfade entre dues imatges."""
-    c1 = ImageClip(img1).with_duration(durada)
-    c2 = ImageClip(img2).with_duration(durada).with_start(durada - fade)
+def crossfade_pair(img1, img2, durada, fade, inici=0.0):
+    """Capes d'un crossfade entre dues imatges, començant a `inici`."""
+    c1 = ImageClip(img1).with_duration(durada).with_start(inici)
+    # la parella dura durada + fade: la segona imatge s'hi talla
+    c2 = (ImageClip(img2).with_duration(min(durada, 2 * fade))
+          .with_start(inici + durada - fade))
 
     # Animar opacitat de la segona imatge (0→1)
-    c2 = c2.with_opacity(lambda t: max(0, min(1, t / fade)))
-
-    # Combinar les dues imatges en un sol clip
-    comp = CompositeVideoClip([c1, c2]).with_duration(durada + fade)
-    return comp
+    c2 = c2.with_effects([vfx.CrossFadeIn(fade)])
+    return [c1, c2]
 
 # --- Construcció del vídeo ---
-clips = []
+# Totes les capes en una sola llista (sense CompositeVideoClip niats):
+# cada parella comença `DURADA` segons després de l'anterior
+capes = []
 for i in range(len(IMATGES) - 1):
-    clips.append(crossfade_pair(IMATGES[i], IMATGES[i + 1], DURADA, FADE))
+    capes += crossfade_pair(IMATGES[i], IMATGES[i + 1], DURADA, FADE, inici=i * DURADA)
 
-# Concatena tots els crossfades
-final = CompositeVideoClip([clips[0]])
-for i in range(1, len(clips)):
-    final = CompositeVideoClip([final, clips[i].with_start(final.duration - FADE)])
+final = composite_clips(capes, size=capes[0].size)
 
 final.write_videofile("output/crossfade_demo.mp4", fps=FPS)
 print("✅ Crossfade creat correctament!")
@@ -1,35 +1,319 @@
 #!/usr/bin/env python3
+"""
+Extrae los frames de un vídeo a imágenes.
+
+Un hilo decodifica (cap.read) y deja los frames en una cola acotada; un
+grupo de hilos los comprime y escribe en paralelo (cv2.imwrite libera el
+GIL). Cada frame lleva su índice de origen, así que la numeración de los
+ficheros es la misma con cualquier número de workers.
+
+Muestreo (--start/--end, --every-n, --every-seconds): los frames que no se
+guardan se saltan con grab() (sin convertir a imagen) o, si el salto es
+largo, con un seek. --keyframes-only decodifica solo los keyframes con
+ffmpeg (-skip_frame nokey). En estos modos el nombre de cada fichero lleva
+el instante de origen: frame_<índice>_<segundos>s.<fmt>.
+
+--scenes guarda solo un frame por plano (scene_detect) y un CSV con los
+cortes. --format store escribe todos los frames en un solo fichero sin
+comprimir más un índice (frame_store), legible con np.memmap.
+"""
 import cv2
 import argparse
+import numpy as np
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
 from pathlib import Path
 
-def extract_frames(video_path: Path, out_dir: Path):
-    out_dir.mkdir(parents=True, exist_ok=True)
+import scene_detect
+from frame_store import FrameStoreWriter
 
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        print("No se puede abrir el vídeo.")
-        return
+FORMATS = ("jpg", "png", "webp", "store")
+STORE_NAME = "frames.store"
+
+# con --every-seconds, a partir de este salto se hace seek en lugar de grab()
+SEEK_MIN_SECONDS = 2.0
+
+
+def _write_params(fmt: str, quality: int) -> list[int]:
+    if fmt == "jpg":
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if fmt == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    return []
 
+
+def _all_frames(cap):
+    """(índice, None, frame) de todos los frames, en orden."""
     idx = 0
     while True:
         ok, frame = cap.read()
         if not ok:
-            break
-        out_path = out_dir / f"frame_{idx:06d}.jpg"
-        cv2.imwrite(str(out_path), frame)
+            return
+        yield idx, None, frame
         idx += 1
 
-    cap.release()
-    print(f"Frames extraídos: {idx}")
+
+def _cv2_frames(cap, start: float = 0.0, end: float | None = None,
+                every_n: int = 1, every_seconds: float = 0.0):
+    """(índice, segundos, frame) de los frames seleccionados; el resto solo se hace grab()."""
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_MSEC, start * 1000)
+    target = start
+    while True:
+        if not cap.grab():
+            return
+        t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if end is not None and t >= end:
+            return
+        if t + 1e-6 < target:
+            continue
+        ok, frame = cap.retrieve()
+        if not ok:
+            return
+        yield round(t * fps), t, frame
+
+        if every_seconds > 0:
+            while target <= t + 1e-6:
+                target += every_seconds
+            if target - t >= SEEK_MIN_SECONDS:
+                cap.set(cv2.CAP_PROP_POS_MSEC, target * 1000)
+        else:
+            for _ in range(every_n - 1):
+                if not cap.grab():
+                    return
+
+
+def _keyframes(video_path: Path, start: float = 0.0, end: float | None = None,
+               every_n: int = 1, every_seconds: float = 0.0, fps: float = 0.0):
+    """(índice, segundos, frame) de los keyframes, decodificando solo estos con ffmpeg."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-loglevel", "info",
+        "-skip_frame", "nokey",
+        *(["-ss", str(start)] if start > 0 else []),
+        "-i", str(video_path),
+        "-an",
+        "-vf", "showinfo",
+        "-fps_mode", "passthrough",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # showinfo escribe el instante y el tamaño de cada frame por stderr. Sin
+    # -copyts, pts_time cuenta desde el inicio del stream (o desde -ss), la
+    # misma base de tiempo que CAP_PROP_POS_MSEC en los modos de cv2.
+    infos = queue.Queue()
+
+    def read_info():
+        pattern = re.compile(rb"pts_time:\s*(\S+).*?\bs:(\d+)x(\d+)")
+        for line in proc.stderr:
+            m = pattern.search(line)
+            if m:
+                infos.put((start + float(m.group(1)), int(m.group(2)), int(m.group(3))))
+        infos.put(None)
+
+    threading.Thread(target=read_info, daemon=True).start()
+    target, seen = start, 0
+    try:
+        while True:
+            info = infos.get()
+            if info is None:
+                return
+            t, w, h = info
+            data = proc.stdout.read(w * h * 3)
+            if len(data) < w * h * 3 or (end is not None and t >= end):
+                return
+            if t + 1e-6 < target:
+                continue
+            seen += 1
+            if (seen - 1) % every_n:
+                continue
+            if every_seconds > 0:
+                while target <= t + 1e-6:
+                    target += every_seconds
+            yield round(t * fps), t, np.frombuffer(data, dtype=np.uint8).reshape(h, w, 3)
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def _decode(source, frames: queue.Queue, errors: list, n_workers: int, counter: list):
+    n = 0
+    try:
+        for item in source:
+            if errors:
+                break
+            frames.put(item)
+            n += 1
+    except Exception as e:
+        errors.append(e)
+    finally:
+        counter[0] = n
+        for _ in range(n_workers):
+            frames.put(None)
+
+
+def frame_name(idx: int, t: float | None, fmt: str) -> str:
+    """frame_NNNNNN.<fmt>, o con el instante de origen si `t` no es None."""
+    if t is None:
+        return f"frame_{idx:06d}.{fmt}"
+    return f"frame_{idx:06d}_{t:010.3f}s.{fmt}"
+
+
+def _image_writer(out_dir: Path, fmt: str, params: list[int]):
+    def write(idx, t, frame):
+        out_path = out_dir / frame_name(idx, t, fmt)
+        if not cv2.imwrite(str(out_path), frame, params):
+            raise OSError(f"No se pudo escribir {out_path}")
+    return write
+
+
+def _encode(frames: queue.Queue, write, errors: list):
+    while True:
+        item = frames.get()
+        if item is None:
+            return
+        if errors:
+            # tras un error solo se vacía la cola (el decodificador no se bloquea)
+            continue
+        try:
+            write(*item)
+        except Exception as e:
+            errors.append(e)
+
+
+def extract_frames(video_path: Path, out_dir: Path, fmt: str = "jpg", quality: int = 95,
+                   workers: int = 0, queue_size: int = 0, start: float = 0.0,
+                   end: float | None = None, every_n: int = 1, every_seconds: float = 0.0,
+                   keyframes_only: bool = False, scenes: bool = False,
+                   scene_threshold: float = scene_detect.DEFAULT_THRESHOLD,
+                   scene_pick: str = "first", scene_min_len: float = scene_detect.DEFAULT_MIN_LEN,
+                   scenes_csv: Path | None = None) -> int:
+    """
+    Extrae los frames de `video_path` a `out_dir` como frame_NNNNNN.<fmt>.
+    workers: hilos de compresión (0 = uno por CPU); quality: calidad jpg/webp.
+    start/end (s), every_n, every_seconds y keyframes_only seleccionan qué
+    frames se guardan; con cualquiera de ellos el nombre lleva el instante.
+    scenes: un frame por plano (el primero o el más nítido, scene_pick) y
+    CSV de cortes en `scenes_csv` (por defecto out_dir/scenes.csv).
+    fmt="store": un solo fichero out_dir/frames.store (frame_store.FrameStore).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    if every_n < 1 or every_seconds < 0:
+        raise ValueError("every_n debe ser >= 1 y every_seconds >= 0")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        print("No se puede abrir el vídeo.")
+        return 0
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    # el almacén guarda siempre el instante de cada frame
+    sampled = bool(start > 0 or end is not None or every_n > 1 or every_seconds
+                   or keyframes_only or scenes or fmt == "store")
+    if keyframes_only:
+        cap.release()
+        source = _keyframes(video_path, start, end, every_n, every_seconds, fps)
+    elif sampled:
+        source = _cv2_frames(cap, start, end, every_n, every_seconds)
+    else:
+        source = _all_frames(cap)
+    shots = []
+    if scenes:
+        source = scene_detect.detect_scenes(source, shots, scene_threshold, scene_pick,
+                                              scene_min_len)
+
+    store = None
+    if fmt == "store":
+        # un solo escritor: los frames se añaden en orden
+        store = FrameStoreWriter(out_dir / STORE_NAME, fps=fps)
+        workers, write = 1, store.append
+    else:
+        workers = workers or os.cpu_count() or 1
+        write = _image_writer(out_dir, fmt, _write_params(fmt, quality))
+    frames = queue.Queue(maxsize=queue_size or 2 * workers)
+    errors, counter = [], [0]
+
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        encoders = [threading.Thread(target=_encode, args=(frames, write, errors), daemon=True)
+                    for _ in range(workers)]
+        for t in encoders:
+            t.start()
+        decoder = threading.Thread(target=_decode,
+                                   args=(source, frames, errors, workers, counter), daemon=True)
+        decoder.start()
+        decoder.join()
+        for t in encoders:
+            t.join()
+        if errors:
+            raise errors[0]
+        ok = True
+    finally:
+        cap.release()
+        if store is not None:
+            # si algo falla no queda un almacén a medias (sin índice)
+            store.close() if ok else store.abort()
+
+    n = counter[0]
+    elapsed = time.perf_counter() - t0
+    print(f"Frames extraídos: {n} en {elapsed:.1f}s "
+          f"({n / max(elapsed, 1e-9):.1f} fps, {workers} workers)")
+    if scenes:
+        scenes_csv = scenes_csv or out_dir / "scenes.csv"
+        names = ([f"{STORE_NAME}[{i}]" for i in range(len(shots))] if store is not None
+                 else [frame_name(s.idx, s.t, fmt) for s in shots])
+        scene_detect.write_cuts_csv(scenes_csv, shots, names)
+        print(f"Planos: {len(shots)} (cortes en {scenes_csv})")
+    if store is not None:
+        print(f"Almacén: {store.path} ({n} frames {'x'.join(map(str, store.shape or ()))})")
+    return n
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--video", required=True, help="Ruta del vídeo")
     ap.add_argument("--output", required=True, help="Carpeta de salida")
+    ap.add_argument("--format", choices=FORMATS, default="jpg", help="Formato de imagen (store = un solo fichero sin comprimir)")
+    ap.add_argument("--quality", type=int, default=95, help="Calidad jpg/webp (0-100)")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="Hilos que comprimen y escriben (0 = uno por CPU)")
+    ap.add_argument("--start", type=float, default=0.0, help="Segundo inicial")
+    ap.add_argument("--end", type=float, default=None, help="Segundo final (excluido)")
+    sampling = ap.add_mutually_exclusive_group()
+    sampling.add_argument("--every-n", type=int, default=1,
+                          help="Guarda un frame de cada N")
+    sampling.add_argument("--every-seconds", type=float, default=0.0,
+                          help="Guarda un frame cada S segundos (seek en saltos largos)")
+    ap.add_argument("--keyframes-only", action="store_true",
+                    help="Solo keyframes, sin decodificar el resto (requiere ffmpeg)")
+    ap.add_argument("--scenes", action="store_true",
+                    help="Un frame por plano y CSV con los cortes")
+    ap.add_argument("--scene-threshold", type=float, default=scene_detect.DEFAULT_THRESHOLD,
+                    help="Puntuación mínima de corte, 0-1 (más bajo = más planos)")
+    ap.add_argument("--scene-pick", choices=scene_detect.PICKS, default="first",
+                    help="Frame que se guarda de cada plano")
+    ap.add_argument("--scene-min-len", type=float, default=scene_detect.DEFAULT_MIN_LEN,
+                    help="Duración mínima de un plano en segundos")
+    ap.add_argument("--scenes-csv", type=Path, default=None,
+                    help="CSV de cortes (por defecto <output>/scenes.csv)")
     args = ap.parse_args()
+    if args.every_n < 1 or args.every_seconds < 0:
+        raise SystemExit("--every-n debe ser >= 1 y --every-seconds >= 0")
+    if args.end is not None and args.end <= args.start:
+        raise SystemExit("--end debe ser mayor que --start")
 
-    extract_frames(Path(args.video), Path(args.output))
+    extract_frames(Path(args.video), Path(args.output), fmt=args.format,
+                   quality=args.quality, workers=args.workers, start=args.start,
+                   end=args.end, every_n=args.every_n, every_seconds=args.every_seconds,
+                   keyframes_only=args.keyframes_only, scenes=args.scenes,
+                   scene_threshold=args.scene_threshold, scene_pick=args.scene_pick,
+                   scene_min_len=args.scene_min_len, scenes_csv=args.scenes_csv)
 
 if __name__ == "__main__":
     main()
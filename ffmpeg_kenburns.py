@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# ffmpeg_kenburns.py
+"""
+Backend Ken Burns 100% ffmpeg: cada model de moviment (linear, pingpong,
+tiktok) es compila a expressions de `zoompan`, de manera que cap frame
+passa per Python. Cada imatge es codifica com a segment (N alhora) i
+s'uneixen amb concat -c copy (segment_render.concat_copy).
+
+Per evitar distorsió, la imatge es reescala a "cover" i s'omple (pad) fins
+a l'aspecte de sortida; la caixa de zoompan mai surt de la imatge real.
+El sobremostreig (`oversample`) redueix el tremolor dels x/y enters de
+zoompan.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from frame_store import StoreFrame
+from image_pyramid import source_size
+from kenburns_engine import MODES, TIKTOK_PAN, timeline_frames
+from profiling import add_frames, stage
+from file_utils import atomic_output
+from segment_cache import pending
+from segment_render import SEGMENT_FFMPEG_PARAMS, concat_copy
+
+
+def _even(x: float) -> int:
+    return max(2, int(round(x / 2)) * 2)
+
+
+def zoom_expr(mode: str, z0: float, z1: float, u: str) -> str:
+    """Zoom (relatiu a "cover") en funció del progrés `u` (expressió 0..1)."""
+    if mode == "pingpong":
+        return (f"if(lte({u},0.5),{z0}+({z1 - z0})*({u})/0.5,"
+                f"{z1}-({z1 - z0})*(({u})-0.5)/0.5)")
+    if mode == "tiktok":
+        ease = f"(({u})*({u})*(3-2*({u})))"
+        return f"({z0}+({z1 - z0})*{ease})"
+    return f"({z0}+({z1 - z0})*({u}))"
+
+
+def kenburns_filter(img_size: tuple[int, int], duration: float, fps: float,
+                    out_w: int, out_h: int, z0: float, z1: float,
+                    mode: str = "linear", oversample: int = 2,
+                    n_frames: int | None = None, offset: float = 0.0) -> str:
+    """
+    Cadena de filtres (una entrada d'imatge → `n_frames` frames, per
+    defecte els de `duration` s). `offset`: frames entre l'inici del clip i
+    el primer frame (a la línia de temps global no sempre hi coincideixen).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode Ken Burns desconegut: {mode}")
+
+    W0, H0 = img_size
+    if n_frames is None:
+        n_frames = int(duration * fps)
+
+    # imatge "cover" sobremostrejada i pad fins a l'aspecte de sortida
+    k = max(out_w / W0, out_h / H0) * oversample
+    Wi, Hi = _even(W0 * k), _even(H0 * k)
+    PW = max(Wi, _even(Hi * out_w / out_h))
+    PH = max(Hi, _even(PW * out_h / out_w))
+    px, py = (PW - Wi) // 2, (PH - Hi) // 2
+
+    # progrés com a KenBurns.progress: t / duration
+    u = f"min(1,(on+{offset})/{duration * fps})"
+    z = zoom_expr(mode, z0, z1, u)
+
+    if mode == "tiktok":
+        cx = f"({px}+{Wi}/2+{Wi}*{TIKTOK_PAN}*sin(PI*({u}-0.5)))"
+    else:
+        cx = f"{px + Wi / 2}"
+    cy = f"{py + Hi / 2}"
+
+    # caixa = iw/zoom x ih/zoom; clamp dins de la imatge real (no el pad)
+    x = f"max({px},min({cx}-iw/zoom/2,{px + Wi}-iw/zoom))"
+    y = f"max({py},min({cy}-ih/zoom/2,{py + Hi}-ih/zoom))"
+
+    return (
+        f"scale={Wi}:{Hi}:flags=lanczos,"
+        f"pad={PW}:{PH}:{px}:{py},"
+        f"zoompan=z='{z}*{PW / (out_w * oversample)}':x='{x}':y='{y}'"
+        f":d={n_frames}:s={out_w}x{out_h}:fps={fps},"
+        f"setsar=1,format=yuv420p"
+    )
+
+
+def render_segment(img_path: Path, out: Path, duration: float, fps: float,
+                   out_w: int, out_h: int, z0: float, z1: float,
+                   mode: str = "linear", codec: str = "libx264",
+                   preset: str = "medium", oversample: int = 2,
+                   n_frames: int | None = None, offset: float = 0.0) -> None:
+    if n_frames is None:
+        n_frames = int(duration * fps)
+    size = source_size(img_path)
+    src = img_path
+    if isinstance(img_path, StoreFrame):
+        # frame d'un magatzem: rgb24 cru a partir de la seva posició al fitxer
+        src = img_path.store
+        source = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}",
+                  "-skip_initial_bytes", str(img_path.offset)]
+    elif Path(img_path).suffix == ".npy":
+        # .npy d'ingest: un sol frame rgb24 després de la capçalera
+        with open(img_path, "rb") as f:
+            np.lib.format.read_magic(f)
+            np.lib.format.read_array_header_1_0(f)
+            header = f.tell()
+        source = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}",
+                  "-skip_initial_bytes", str(header)]
+    else:
+        source = []
+
+    vf = kenburns_filter(size, duration, fps, out_w, out_h, z0, z1, mode, oversample,
+                         n_frames, offset)
+    cmd = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "error",
+        *source,
+        "-i", str(src),
+        "-vf", vf,
+        "-frames:v", str(n_frames),
+        "-an",
+        "-c:v", codec,
+        "-preset", preset,
+        *SEGMENT_FFMPEG_PARAMS,
+        str(out),
+    ]
+    with stage("ffmpeg_segment"):
+        p = subprocess.run(cmd, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise SystemExit(p.stderr.strip() or f"ffmpeg falló (code={p.returncode})")
+    add_frames(n_frames)
+
+
+def write_kenburns_ffmpeg(specs: list[dict], out, fps: float, out_w: int, out_h: int,
+                          jobs: int = 1, codec: str = "libx264",
+                          preset: str = "medium", oversample: int = 2,
+                          cached: list[Path] | None = None) -> None:
+    """
+    Renderitza una seqüència Ken Burns sense Python per frame.
+    `specs`: dicts amb img_path, duration, z0, z1 i mode.
+    Cada imatge té els frames que li toquen a la línia de temps global
+    (kenburns_engine.timeline_frames), com amb MoviePy.
+    Amb `cached` (rutes del segment_cache) només es codifiquen els que hi falten.
+    """
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    durations = [s["duration"] for s in specs]
+    starts = np.cumsum([0.0] + durations)
+    frames = timeline_frames(durations, fps)
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix=f".{out.stem}_seg_", dir=out.parent) as tmp:
+        segments = cached or [Path(tmp) / f"seg_{i:05d}.mp4" for i in range(len(specs))]
+        todo = [i for i in pending(segments) if frames[i][1] > frames[i][0]]
+
+        def encode(i):
+            i0, i1 = frames[i]
+            with atomic_output(segments[i]) as seg:
+                render_segment(out=seg, fps=fps, out_w=out_w, out_h=out_h, codec=codec,
+                               preset=preset, oversample=oversample, n_frames=i1 - i0,
+                               offset=i0 - starts[i] * fps, **specs[i])
+
+        # cada segment és un procés ffmpeg: n'hi ha prou amb fils
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            list(pool.map(encode, todo))
+
+        t1 = time.perf_counter()
+        concat_copy([seg for seg, (i0, i1) in zip(segments, frames) if i1 > i0], out)
+
+    n_frames = frames[-1][1] if frames else 0
+    elapsed = time.perf_counter() - t0
+    print(f"[OK] {out}: {n_frames} frames, {len(todo)}/{len(specs)} segments "
+          f"codificats en {elapsed:.1f}s "
+          f"({n_frames / max(elapsed, 1e-9):.1f} fps, concat {time.perf_counter() - t1:.1f}s)")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# ffmpeg_overlay.py
+"""
+Overlay en loop fusionat dins d'ffmpeg: l'overlay entra com a segona
+entrada amb -stream_loop -1, es porta a l'fps i mida de sortida i es fusiona
+amb el filtre blend. Python només envia els frames del base per la pipe
+(ffmpeg_pipe.FFmpegPipeWriter); mai veu píxels de l'overlay.
+
+La fusió es fa en RGB (gbrp) perquè els modes donin el mateix que
+blend_kernels.py, que treballa sobre frames RGB.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+# nom del mode a blend_kernels -> all_mode del filtre blend
+FFMPEG_BLEND_MODES = {
+    "normal": "normal",
+    "screen": "screen",
+    "multiply": "multiply",
+    "add": "addition",
+    "overlay": "overlay",
+    "soft-light": "softlight",
+}
+
+
+def overlay_filter(size: tuple[int, int], fps: float, mode: str = "screen",
+                   opacity: float = 0.9) -> str:
+    """filter_complex: [0:v] base + [1:v] overlay -> [out]."""
+    if mode not in FFMPEG_BLEND_MODES:
+        raise ValueError(f"Mode de blend desconegut: {mode}")
+    w, h = size
+    # blend calcula top + (f(top, bottom) - top) * opacity, excepte normal,
+    # que fa top * opacity + bottom * (1 - opacity): allà l'overlay va a dalt
+    layers = "[ov][base]" if mode == "normal" else "[base][ov]"
+    return (
+        f"[1:v]fps={fps}:round=down,scale={w}:{h}:flags=bicubic,"
+        f"format=gbrp,setsar=1[ov];"
+        f"[0:v]format=gbrp,setsar=1[base];"
+        f"{layers}blend=all_mode={FFMPEG_BLEND_MODES[mode]}:all_opacity={opacity}"
+        f":shortest=1,format=yuv420p[out]"
+    )
+
+
+def overlay_writer_args(overlay_path: Path, size: tuple[int, int], fps: float,
+                        mode: str = "screen", opacity: float = 0.9) -> dict:
+    """Arguments de FFmpegPipeWriter (via writer_args) per afegir l'overlay."""
+    return dict(
+        extra_inputs=["-stream_loop", "-1", "-i", str(overlay_path)],
+        filter_complex=overlay_filter(size, fps, mode, opacity),
+    )
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# ffmpeg_pipe.py
+"""
+Escriptor lleuger de vídeo: envia frames rawvideo a un procés ffmpeg per
+stdin, sense el bucle de frames de MoviePy.
+
+Els frames es copien a dos buffers preassignats i reutilitzats; un fil en
+segon pla escriu un buffer a la pipe mentre Python ja calcula el següent
+frame sobre l'altre (double buffering).
+"""
+
+from __future__ import annotations
+
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from kenburns_engine import get_frame_block, get_yuv_block
+from profiling import add_frames, stage
+from yuv420 import yuv_frame_size
+
+
+class FFmpegPipeWriter:
+    """
+    Codifica frames (h, w, 3) uint8 a `filename` amb ffmpeg. Amb
+    pix_fmt="yuv420p", cada frame són els bytes yuv420p (yuv420.py).
+
+    `extra_inputs` (arguments -i addicionals) i `filter_complex` permeten
+    que ffmpeg combini els frames (entrada 0) amb altres fonts; el filtre
+    ha d'acabar a l'etiqueta [out].
+    """
+
+    def __init__(self, filename, size, fps: float, codec: str = "libx264",
+                 preset: str = "medium", ffmpeg_params: list[str] | None = None,
+                 n_buffers: int = 2, extra_inputs: list[str] | None = None,
+                 filter_complex: str | None = None, pix_fmt: str = "rgb24"):
+        w, h = size
+        self.filename = str(filename)
+        self.frames = 0
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo", "-vcodec", "rawvideo",
+            "-s", f"{w}x{h}",
+            "-pix_fmt", pix_fmt,
+            "-r", f"{fps}",
+            "-i", "-",
+            *(extra_inputs or []),
+        ]
+        if filter_complex:
+            cmd += ["-filter_complex", filter_complex, "-map", "[out]"]
+        cmd += [
+            "-an",
+            "-vcodec", codec,
+            "-preset", preset,
+        ]
+        if codec == "libx264" and w % 2 == 0 and h % 2 == 0:
+            cmd += ["-pix_fmt", "yuv420p"]
+        cmd += list(ffmpeg_params or [])
+        cmd.append(self.filename)
+
+        # stderr a fitxer: una PIPE sense llegir pot bloquejar ffmpeg
+        self._log = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=self._log)
+
+        shape = (yuv_frame_size(w, h),) if pix_fmt == "yuv420p" else (h, w, 3)
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(n_buffers)]
+        self._free = queue.Queue()
+        for i in range(n_buffers):
+            self._free.put(i)
+        self._filled = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        while True:
+            i = self._filled.get()
+            if i is None:
+                break
+            try:
+                if self._error is None:
+                    self.proc.stdin.write(memoryview(self._buffers[i]))
+            except (BrokenPipeError, OSError) as err:
+                self._error = err
+            self._free.put(i)
+
+    def write_frame(self, frame: np.ndarray) -> None:
+        if self._error is not None:
+            self._raise()
+        with stage("pipe_wait"):
+            i = self._free.get()
+        np.copyto(self._buffers[i], frame, casting="unsafe")
+        self._filled.put(i)
+        self.frames += 1
+        add_frames()
+
+    def write_frames(self, block: np.ndarray) -> None:
+        """Escriu un bloc (N, h, w, 3) de frames consecutius."""
+        for frame in block:
+            self.write_frame(frame)
+
+    def close(self) -> None:
+        with stage("pipe_close"):
+            self._filled.put(None)
+            self._thread.join()
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            code = self.proc.wait()
+        if code != 0 or self._error is not None:
+            self._raise()
+        self._log.close()
+
+    def abort(self) -> None:
+        """Atura ffmpeg sense esperar (fitxer de sortida incomplet)."""
+        self.proc.kill()
+        self._filled.put(None)
+        self._thread.join()
+        self.proc.wait()
+        self._log.close()
+
+    def _raise(self):
+        self.proc.kill()
+        self._log.seek(0)
+        err = self._log.read().decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg ha fallat escrivint {self.filename}:\n{err}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_clip_pipe(clip, filename, fps: float, codec: str = "libx264",
+                    preset: str = "medium",
+                    ffmpeg_params: list[str] | None = None,
+                    batch: int = 0, writer_args: dict | None = None,
+                    yuv: bool = False) -> None:
+    """
+    Equivalent a clip.write_videofile(filename, fps=fps, codec=codec,
+    audio=False): mateix nombre de frames (int(duration * fps)) i mateixos
+    instants t = i / fps.
+
+    Amb batch > 0 i un clip amb API de blocs (kenburns_engine.with_frame_block)
+    es demanen els frames de `batch` en `batch`. `writer_args` s'afegeix
+    als arguments de FFmpegPipeWriter (p. ex. extra_inputs, filter_complex).
+
+    Amb yuv=True i un clip amb API yuv420p (Ken Burns, kenburns_engine.
+    with_yuv_block) els frames es mostregen i s'envien directament en
+    yuv420p, per blocs (mostreig bilineal, com amb batch).
+    """
+    n_frames = int(clip.duration * fps)
+    frame_block = get_frame_block(clip) if batch > 0 else None
+    pix_fmt = "rgb24"
+    if yuv:
+        if get_yuv_block(clip) is not None:
+            frame_block, pix_fmt = get_yuv_block(clip), "yuv420p"
+            batch = batch or 16
+        else:
+            print("[WARN] el clip no té camí yuv420p; s'escriu en RGB.")
+
+    t0 = time.perf_counter()
+    with FFmpegPipeWriter(filename, clip.size, fps, codec=codec, preset=preset,
+                          ffmpeg_params=ffmpeg_params, pix_fmt=pix_fmt,
+                          **(writer_args or {})) as writer:
+        if frame_block is not None:
+            for i in range(0, n_frames, batch):
+                ts = np.arange(i, min(i + batch, n_frames)) / fps
+                with stage("frame_block"):
+                    block = frame_block(ts)
+                writer.write_frames(block)
+        else:
+            for i in range(n_frames):
+                with stage("frame"):
+                    frame = clip.get_frame(i / fps)
+                writer.write_frame(frame)
+    elapsed = time.perf_counter() - t0
+
+    print(f"[OK] {filename}: {n_frames} frames en {elapsed:.1f}s "
+          f"({n_frames / max(elapsed, 1e-9):.1f} fps)")
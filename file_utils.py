@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# file_utils.py
+"""
+Utilitats de fitxers sense dependències (només la biblioteca estàndard):
+hash del contingut i escriptura atòmica (temporal + rename), compartides pels
+caches (overlay, segments, ingest) i per batch_convert.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def file_hash(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+@contextmanager
+def atomic_output(path: Path):
+    """Ruta temporal (mateixa extensió) que es renombra a `path` si tot va bé."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
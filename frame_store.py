@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# frame_store.py
+"""
+Almacén de frames en un solo fichero (extract_frames --format store).
+
+Los frames se guardan sin comprimir, uno detrás de otro, en un fichero de
+datos (uint8 RGB, todos del mismo tamaño) y al cerrar se escribe al lado un
+índice JSON con la forma, el número de frame y el instante de cada uno.
+FrameStore abre los datos con np.memmap: leer el frame i es acceder a una
+vista del fichero, sin descodificar ni abrir un fichero por frame.
+
+Los scripts de slideshow aceptan un almacén donde esperan una carpeta de
+imágenes: list_images devuelve un StoreFrame (almacén, posición) por frame,
+y image_pyramid, ingest y ffmpeg_kenburns leen el frame directamente del
+memmap (ffmpeg, saltando hasta su posición en el fichero).
+
+Solo depende de numpy: lo importan también los scripts de render.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from file_utils import file_hash
+
+STORE_VERSION = 1
+CHUNK_FRAMES = 32
+
+
+def index_path(path: Path) -> Path:
+    """Índice JSON del almacén `path` (frames.store -> frames.store.json)."""
+    path = Path(path)
+    return path.with_name(path.name + ".json")
+
+
+def is_store(path: Path) -> bool:
+    path = Path(path)
+    return path.is_file() and index_path(path).is_file()
+
+
+class FrameStoreWriter:
+    """
+    Escribe frames (BGR de OpenCV, o RGB con bgr=False) al final del almacén,
+    en bloques de `chunk` frames. El índice se escribe en close(); abort()
+    descarta lo escrito.
+    """
+
+    def __init__(self, path: Path, fps: float | None = None, chunk: int = CHUNK_FRAMES,
+                 bgr: bool = True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        index_path(self.path).unlink(missing_ok=True)
+        self.fps = fps
+        self.chunk = chunk
+        self.bgr = bgr
+        self.shape = None
+        self.frame_numbers, self.times = [], []
+        self._buf = None
+        self._n = 0
+        self._f = open(self.path, "wb")
+
+    def append(self, idx: int, t: float | None, frame: np.ndarray) -> None:
+        if self.shape is None:
+            self.shape = frame.shape
+            self._buf = np.empty((self.chunk, *frame.shape), dtype=np.uint8)
+        elif frame.shape != self.shape:
+            raise ValueError(f"Frame {idx} de tamaño {frame.shape}, el almacén es {self.shape}")
+        if self.bgr:
+            self._buf[self._n] = frame[..., ::-1]
+        else:
+            self._buf[self._n] = frame
+        self._n += 1
+        self.frame_numbers.append(int(idx))
+        self.times.append(None if t is None else float(t))
+        if self._n == self.chunk:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._n:
+            self._f.write(self._buf[:self._n].data)
+            self._n = 0
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._flush()
+        self._f.close()
+        index = dict(version=STORE_VERSION, dtype="uint8", pix_fmt="rgb24",
+                     shape=list(self.shape or ()), count=len(self.frame_numbers),
+                     fps=self.fps, frame=self.frame_numbers, t=self.times)
+        tmp = index_path(self.path).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(index))
+        os.replace(tmp, index_path(self.path))
+
+    def abort(self) -> None:
+        """Cierra sin índice y borra los datos: una escritura fallida no deja almacén."""
+        if not self._f.closed:
+            self._f.close()
+        self.path.unlink(missing_ok=True)
+        index_path(self.path).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close() if exc_type is None else self.abort()
+        return False
+
+
+class FrameStore:
+    """
+    Lectura de un almacén: store[i] es el frame i (h, w, 3) RGB, una vista
+    del memmap. frame_numbers y times dicen de dónde sale cada uno.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        index = json.loads(index_path(self.path).read_text())
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Versión de almacén no soportada: {index.get('version')}")
+        self.fps = index["fps"]
+        self.shape = tuple(index["shape"])
+        self.frame_numbers = np.asarray(index["frame"], dtype=np.int64)
+        self.times = np.asarray([np.nan if t is None else t for t in index["t"]],
+                                dtype=np.float64)
+        n = index["count"]
+        self.frames = (np.memmap(self.path, dtype=np.uint8, mode="r", shape=(n, *self.shape))
+                       if n else np.empty((0, *self.shape), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        return self.frames[i]
+
+    def index_at(self, t: float) -> int:
+        """Posición del último frame con instante <= t (o el primero)."""
+        i = int(np.searchsorted(self.times, t, side="right")) - 1
+        return min(max(i, 0), len(self) - 1)
+
+    def frame_at(self, t: float) -> np.ndarray:
+        return self.frames[self.index_at(t)]
+
+
+@lru_cache(maxsize=8)
+def open_store(path: Path) -> FrameStore:
+    """FrameStore compartido por todos los StoreFrame del mismo almacén."""
+    return FrameStore(path)
+
+
+@dataclass(frozen=True)
+class StoreFrame:
+    """Referencia al frame `index` de un almacén; se usa donde se usaría la ruta de una imagen."""
+    store: Path
+    index: int
+
+    def __str__(self) -> str:
+        return f"{self.store}[{self.index}]"
+
+    @property
+    def name(self) -> str:
+        return f"{self.store.name}[{self.index}]"
+
+    def array(self) -> np.ndarray:
+        """Frame (h, w, 3) RGB: vista del memmap, sin copia."""
+        return open_store(self.store).frames[self.index]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        h, w = open_store(self.store).shape[:2]
+        return w, h
+
+    @property
+    def offset(self) -> int:
+        """Posición en bytes del frame dentro del fichero de datos."""
+        return self.index * int(np.prod(open_store(self.store).shape))
+
+    def content_hash(self) -> str:
+        return hashlib.sha256(self.array()).hexdigest()
+
+
+def source_hash(src) -> str:
+    """Hash del contenido de una imagen: fichero o frame de un almacén."""
+    return src.content_hash() if isinstance(src, StoreFrame) else file_hash(src)
+
+
+def list_images(folder: Path, exts: set[str], key=None) -> list:
+    """
+    Imágenes de `folder` ordenadas (por ruta o por `key`), o un StoreFrame
+    por frame (en orden) si `folder` es un almacén de frames.
+    """
+    folder = Path(folder)
+    if is_store(folder):
+        return [StoreFrame(folder, i) for i in range(len(open_store(folder)))]
+    return sorted((p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in exts),
+                  key=key)
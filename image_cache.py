@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# image_cache.py
+"""
+Càrrega mandrosa i acotada de les imatges dels clips Ken Burns.
+
+Cada clip guarda només la ruta (LazyPyramid); la imatge es descodifica el
+primer cop que cal un frame, es manté en un LRU d'un màxim de K imatges i
+la següent imatge de la seqüència es precarrega en un fil en segon pla.
+Així la memòria màxima no depèn de la llargada del slideshow.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from frame_store import StoreFrame
+from image_pyramid import ImagePyramid, load_pyramid, pyramid_size
+
+DEFAULT_MAX_IMAGES = 4
+
+
+class ImageCache:
+    """LRU de piràmides descodificades amb precàrrega en segon pla."""
+
+    def __init__(self, max_images: int = DEFAULT_MAX_IMAGES):
+        self.max_images = max(1, max_images)
+        self._reset()
+
+    def _reset(self):
+        # també després d'un fork: fils, locks i futures no sobreviuen al fill
+        self._items: OrderedDict = OrderedDict()
+        self._pending: dict = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            future = self._pending.get(key)
+
+        loaded = False
+        if future is not None:
+            try:
+                value = future.result()
+                loaded = True
+            except Exception:
+                # precàrrega fallida: es torna a carregar aquí (i, si falla,
+                # l'error és d'aquest get, no el d'abans)
+                pass
+            finally:
+                with self._lock:
+                    if self._pending.get(key) is future:
+                        del self._pending[key]
+        if not loaded:
+            value = loader()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_images:
+                self._items.popitem(last=False)
+        return value
+
+    def prefetch(self, key, loader) -> None:
+        with self._lock:
+            if key in self._items or key in self._pending:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1,
+                                                    thread_name_prefix="prefetch")
+            self._pending[key] = self._executor.submit(loader)
+
+    def resize(self, max_images: int) -> None:
+        with self._lock:
+            self.max_images = max(1, max_images)
+            while len(self._items) > self.max_images:
+                self._items.popitem(last=False)
+
+
+CACHE = ImageCache()
+os.register_at_fork(after_in_child=CACHE._reset)
+
+
+def set_cache_size(max_images: int) -> None:
+    CACHE.resize(max_images)
+
+
+class LazyPyramid:
+    """
+    Mateixa interfície que ImagePyramid (size, level_index, level_for, array, yuv)
+    però sense descodificar res fins que cal un frame.
+    """
+
+    def __init__(self, img_path: Path, out_w: int, out_h: int,
+                 zmin: float = 1.0, zmax: float = 1.0):
+        self.img_path = img_path if isinstance(img_path, StoreFrame) else Path(img_path)
+        self.key = (str(self.img_path), out_w, out_h, zmin, zmax)
+        self._args = (self.img_path, out_w, out_h, zmin, zmax)
+        # només la capçalera: mida després del draft
+        self.size = pyramid_size(self.img_path, out_w, out_h, zmax)
+
+    def _load(self) -> ImagePyramid:
+        return load_pyramid(*self._args)
+
+    def get(self) -> ImagePyramid:
+        return CACHE.get(self.key, self._load)
+
+    def prefetch(self) -> None:
+        CACHE.prefetch(self.key, self._load)
+
+    def level_index(self, scale: float) -> int:
+        return self.get().level_index(scale)
+
+    def level_for(self, scale: float):
+        return self.get().level_for(scale)
+
+    def array(self, i: int):
+        return self.get().array(i)
+
+    def yuv(self, i: int):
+        return self.get().yuv(i)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# image_pyramid.py
+"""
+Preprocessat de les imatges font per al motor Ken Burns.
+
+- Els JPEG es descodifiquen amb draft (escalat DCT de Pillow) a la mida
+  mínima que encara cobreix el zoom màxim, en lloc de la resolució completa.
+- Es construeix una piràmide (mipmaps /2, /4, ...) i cada frame mostreja
+  del nivell més petit que encara cobreix la seva escala.
+- Els .npy d'ingest.py (ja orientats, en RGB i escalats) i els frames d'un
+  magatzem de frame_store es llegeixen directament, sense descodificar.
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from frame_store import StoreFrame
+from profiling import stage
+from yuv420 import rgb_to_yuv420
+
+
+def _draft(img: Image.Image, scale: float) -> None:
+    # escalat DCT: només JPEG, i només si cal menys resolució que l'original
+    if img.format == "JPEG" and scale < 1.0:
+        W0, H0 = img.size
+        img.draft("RGB", (math.ceil(W0 * scale), math.ceil(H0 * scale)))
+
+
+def _decoded(img_path) -> np.ndarray | None:
+    """Font ja descodificada en RGB (memmap): .npy d'ingest o frame d'un magatzem."""
+    if isinstance(img_path, StoreFrame):
+        return img_path.array()
+    if Path(img_path).suffix == ".npy":
+        return np.load(img_path, mmap_mode="r")
+    return None
+
+
+def source_size(img_path: Path) -> tuple[int, int]:
+    """Mida (w, h) de la imatge font, llegint només la capçalera."""
+    arr = _decoded(img_path)
+    if arr is not None:
+        h, w = arr.shape[:2]
+        return w, h
+    with Image.open(img_path) as img:
+        return img.size
+
+
+def open_image(img_path: Path, scale: float = 1.0) -> Image.Image:
+    """
+    Obre la imatge en RGB. Si és JPEG i només cal `scale` (< 1) de la
+    resolució original, deixa que el descodificador redueixi (1/2, 1/4, 1/8).
+    """
+    with stage("decode"):
+        arr = _decoded(img_path)
+        if arr is not None:
+            return Image.fromarray(np.asarray(arr))
+        img = Image.open(img_path)
+        _draft(img, scale)
+        return img.convert("RGB")
+
+
+class ImagePyramid:
+    """
+    Nivells de la imatge a mida 1, 1/2, 1/4... del nivell 0.
+
+    Les coordenades i escales es donen sempre respecte del nivell 0
+    (`size`); `level_for` tradueix a un nivell concret.
+    """
+
+    def __init__(self, image: Image.Image, min_scale: float = 1.0):
+        self.levels = [image]
+        self.size = image.size
+        self._arrays = {}
+        self._yuv = {}
+
+        # afegim nivells mentre el següent encara cobreix l'escala mínima
+        W0, H0 = self.size
+        with stage("pyramid"):
+            while True:
+                last = self.levels[-1]
+                w, h = last.size[0] // 2, last.size[1] // 2
+                if w < 1 or h < 1 or w / W0 < min_scale or h / H0 < min_scale:
+                    break
+                self.levels.append(last.reduce(2))
+
+    def level_index(self, scale: float) -> int:
+        """Índex del nivell més petit amb almenys `scale` píxels per píxel del nivell 0."""
+        W0, H0 = self.size
+        for i in range(len(self.levels) - 1, 0, -1):
+            w, h = self.levels[i].size
+            if w / W0 >= scale and h / H0 >= scale:
+                return i
+        return 0
+
+    def level_for(self, scale: float) -> tuple[Image.Image, float, float]:
+        """
+        Nivell més petit amb almenys `scale` píxels per píxel del nivell 0.
+        Retorna (imatge, fx, fy) per convertir coordenades del nivell 0.
+        """
+        img = self.levels[self.level_index(scale)]
+        return img, img.size[0] / self.size[0], img.size[1] / self.size[1]
+
+    def array(self, i: int) -> np.ndarray:
+        """Nivell `i` com a array (h, w, 3) uint8, convertit una sola vegada."""
+        if self._arrays.get(i) is None:
+            self._arrays[i] = np.asarray(self.levels[i])
+        return self._arrays[i]
+
+    def yuv(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Nivell `i` com a plans Y (h, w, 1) i UV (h/2, w/2, 2), convertit una sola vegada."""
+        if self._yuv.get(i) is None:
+            self._yuv[i] = rgb_to_yuv420(self.array(i))
+        return self._yuv[i]
+
+
+def load_pyramid(img_path: Path, out_w: int, out_h: int,
+                 zmin: float = 1.0, zmax: float = 1.0) -> ImagePyramid:
+    """
+    Carrega `img_path` preparada per a un Ken Burns a out_w x out_h amb
+    zoom entre zmin i zmax (relatiu a l'escala "cover").
+    """
+    W0, H0 = source_size(img_path)
+    scale_base = max(out_w / W0, out_h / H0)
+
+    img = open_image(img_path, scale_base * zmax)
+    W1, H1 = img.size
+    return ImagePyramid(img, min_scale=max(out_w / W1, out_h / H1) * zmin)
+
+
+def pyramid_size(img_path: Path, out_w: int, out_h: int, zmax: float = 1.0) -> tuple[int, int]:
+    """Mida del nivell 0 que donaria load_pyramid, llegint només la capçalera."""
+    if _decoded(img_path) is not None:
+        return source_size(img_path)
+    with Image.open(img_path) as img:
+        W0, H0 = img.size
+        _draft(img, max(out_w / W0, out_h / H0) * zmax)
+        return img.size
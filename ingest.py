@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# ingest.py
+"""
+Preparació compartida de les imatges font, en paral·lel i amb cache.
+
+Cada imatge es descodifica una sola vegada (draft per als JPEG), s'orienta
+segons l'EXIF, es converteix a RGB i s'escala a "cover" de la mida de
+sortida per `headroom` (el zoom màxim que farà el clip). Amb crop=True
+també es retalla centrada a aquesta mida exacta.
+
+El resultat es desa com a .npy (uint8, h x w x 3) a un directori de cache
+amb clau (hash del contingut, mida, headroom, crop): els renders següents, o
+a una altra resolució ja preparada, no descodifiquen res. Els .npy els
+llegeixen image_pyramid.py, ffmpeg_kenburns.py i load_image.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from frame_store import StoreFrame, source_hash
+from profiling import flush, stage
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "ingest_cache"
+
+
+def normalize_image(src: Path, out_w: int, out_h: int, headroom: float = 1.0,
+                    crop: bool = True) -> np.ndarray:
+    """Imatge `src` orientada, en RGB i a "cover" de (out_w, out_h) * headroom."""
+    tw, th = round(out_w * headroom), round(out_h * headroom)
+    if isinstance(src, StoreFrame):
+        # frame d'un magatzem de frames: ja és RGB, es llegeix del memmap
+        img = Image.fromarray(np.asarray(src.array()))
+    else:
+        with Image.open(src) as img:
+            if img.format == "JPEG":
+                # escalat DCT abans de descodificar (cobrint també la mida girada,
+                # perquè l'orientació EXIF s'aplica després)
+                W, H = img.size
+                s = max(tw / W, th / H, tw / H, th / W)
+                if s < 1.0:
+                    img.draft("RGB", (math.ceil(W * s), math.ceil(H * s)))
+            img = ImageOps.exif_transpose(img).convert("RGB")
+
+    W, H = img.size
+    scale = max(tw / W, th / H)
+    if crop:
+        # cover exacte (també ampliant) i retall centrat a (tw, th)
+        w, h = max(tw, round(W * scale)), max(th, round(H * scale))
+        img = img.resize((w, h), Image.LANCZOS)
+        x, y = (w - tw) // 2, (h - th) // 2
+        img = img.crop((x, y, x + tw, y + th))
+    elif scale < 1.0:
+        # sense retall només es redueix: ampliar no afegeix detall
+        img = img.resize((round(W * scale), round(H * scale)), Image.LANCZOS)
+    return np.asarray(img)
+
+
+def _ingest_one(task) -> Path:
+    src, dst, out_w, out_h, headroom, crop = task
+    with stage("ingest"):
+        arr = normalize_image(src, out_w, out_h, headroom, crop)
+    # temporal + rename: un .npy a mitges mai queda com a entrada vàlida
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, dst)
+    flush()
+    return dst
+
+
+def ingest_images(paths: list[Path], out_w: int, out_h: int, headroom: float = 1.0,
+                  crop: bool = True, jobs: int = 0,
+                  cache_dir: Path | None = None) -> list[Path]:
+    """
+    Retorna, per a cada imatge de `paths`, el .npy normalitzat del cache,
+    preparant amb `jobs` processos (0 = un per CPU) les que hi falten.
+    """
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    tag = f"{out_w}x{out_h}_h{headroom:g}_{'crop' if crop else 'full'}"
+    hashes = {}
+    out, tasks = [], []
+    for src in paths:
+        src = src if isinstance(src, StoreFrame) else Path(src)
+        key = hashes.get(src) or source_hash(src)[:32]
+        hashes[src] = key
+        dst = cache_dir / f"{key}_{tag}.npy"
+        out.append(dst)
+        if not dst.exists() and all(t[1] != dst for t in tasks):
+            tasks.append((src, dst, out_w, out_h, headroom, crop))
+
+    t0 = time.perf_counter()
+    if tasks:
+        jobs = jobs or os.cpu_count() or 1
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+                list(pool.map(_ingest_one, tasks))
+        else:
+            for task in tasks:
+                _ingest_one(task)
+    print(f"[OK] ingest: {len(paths)} imatges ({len(tasks)} noves, "
+          f"{len(paths) - len(tasks)} en cache) en {time.perf_counter() - t0:.1f}s")
+    return out
+
+
+def load_image(path: Path) -> np.ndarray:
+    """
+    Imatge (h, w, 3) uint8 d'un .npy d'ingest o d'un frame de magatzem
+    (memmap), o de qualsevol format de PIL.
+    """
+    if isinstance(path, StoreFrame):
+        return path.array()
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path, mmap_mode="r")
+    with Image.open(path) as img:
+        return np.asarray(ImageOps.exif_transpose(img).convert("RGB"))
+
+
+def add_ingest_args(ap) -> None:
+    ap.add_argument("--ingest", action="store_true",
+                    help="Prepara les imatges (EXIF, RGB, cover) en paral·lel i les "
+                         "guarda al cache d'ingest")
+    ap.add_argument("--ingest-jobs", type=int, default=0,
+                    help="Processos d'ingest (0 = un per CPU)")
+    ap.add_argument("--ingest-cache", default=None,
+                    help="Carpeta del cache d'ingest (per defecte, ingest_cache al "
+                         "directori temporal)")
+
+
+def ingest_from_args(args, paths: list[Path], out_w: int, out_h: int,
+                     headroom: float = 1.0, crop: bool = True) -> list[Path]:
+    """`paths` passats per ingest_images si la CLI ho demana (--ingest), si no tal qual."""
+    if not getattr(args, "ingest", False):
+        return list(paths)
+    return ingest_images(paths, out_w, out_h, headroom=headroom, crop=crop,
+                         jobs=args.ingest_jobs, cache_dir=args.ingest_cache)
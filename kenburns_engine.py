@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# kenburns_engine.py
+"""
+Motor Ken Burns compartit pels scripts make_*.
+
+Cada frame es tradueix a una caixa en coordenades de la imatge original
+i només aquesta caixa es remostreja directament a la mida de sortida
+(Image.resize amb box=...). Així el cost per frame depèn de la mida de
+sortida, no del zoom ni de la mida de la imatge font.
+
+La font és una ImagePyramid (image_pyramid.py): cada frame mostreja del
+nivell més petit que encara cobreix la seva escala. ken_burns_clip la
+carrega mandrosament a través de l'LRU d'image_cache.py.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from moviepy import VideoClip
+
+from image_cache import LazyPyramid
+from image_pyramid import ImagePyramid
+from profiling import stage
+from yuv420 import pack_yuv420
+
+MODES = ("linear", "pingpong", "tiktok")
+
+# paneig horitzontal del mode tiktok: 12% de l'amplada escalada
+TIKTOK_PAN = 0.12
+
+
+def zoom_linear(u, z0: float, z1: float):
+    return z0 + (z1 - z0) * u
+
+
+def zoom_pingpong(u, z0: float, z1: float):
+    # 0..0.5 → zoom in ; 0.5..1 → zoom out
+    return np.where(u <= 0.5,
+                    z0 + (z1 - z0) * (u / 0.5),
+                    z1 - (z1 - z0) * ((u - 0.5) / 0.5))
+
+
+def smoothstep(u):
+    return u * u * (3 - 2 * u)
+
+
+def _taps(cs: np.ndarray) -> np.ndarray:
+    """
+    Coordenades (N, L) -> (T, N, L): les mateixes (T=1) o, si en algun
+    frame el pas entre mostres és de més d'un píxel de src, dues per mostra
+    a ±(pas - 1)/2 (els frames amb pas <= 1 hi repeteixen la mateixa).
+    """
+    if cs.shape[1] < 2:
+        return cs[None]
+    step = (cs[:, -1] - cs[:, 0]) / (cs.shape[1] - 1)
+    if step.max() <= 1:
+        return cs[None]
+    d = np.where(step > 1, (step - 1) / 2, 0).astype(np.float32)[:, None]
+    return np.stack([cs - d, cs + d])
+
+
+def sample_bilinear(src: np.ndarray, ys: np.ndarray, xs: np.ndarray,
+                    out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Mostreig bilineal separable d'un bloc de frames, en punt fix (pesos /256).
+    src: (Hs, Ws, 3) uint8; ys: (N, H) i xs: (N, W) coordenades float32 en
+    píxels de src. Retorna (N, H, W, 3) uint8.
+
+    En reduir (el nivell de piràmide pot tenir fins a 2 píxels per píxel de
+    sortida), cada eix fa la mitjana de dues mostres a ±(pas - 1)/2: el
+    filtre s'eixampla amb el pas (fins a l'àrea del píxel de sortida amb
+    pas 2), perquè el bilineal sol no faci aliasing amb el detall fi. Amb
+    pas <= 1 és el bilineal de sempre.
+    """
+    Hs, Ws = src.shape[:2]
+    N, H, W = len(xs), ys.shape[1], xs.shape[1]
+    if out is None:
+        out = np.empty((N, H, W, src.shape[2]), dtype=np.uint8)
+
+    # índexs i pesos de tot el bloc d'una vegada (T mostres per eix)
+    xs, ys = _taps(xs), _taps(ys)
+    xf = np.floor(xs)
+    yf = np.floor(ys)
+    wx = ((xs - xf) * 256 + 0.5).astype(np.uint16)[..., None]
+    wy = ((ys - yf) * 256 + 0.5).astype(np.uint16)[..., None, None]
+    xi = xf.astype(np.intp)
+    yi = yf.astype(np.intp)
+
+    # només les columnes que toca alguna caixa del bloc
+    c0 = int(np.clip(xi.min(), 0, Ws - 1))
+    c1 = int(np.clip(xi.max() + 2, c0 + 1, Ws))
+    sub = src[:, c0:c1]
+    xa = np.clip(xi - c0, 0, c1 - c0 - 1)
+    xb = np.clip(xi + 1 - c0, 0, c1 - c0 - 1)
+    ya = np.clip(yi, 0, Hs - 1)
+    yb = np.clip(yi + 1, 0, Hs - 1)
+
+    for n in range(N):
+        # vertical: files senceres (còpies contigües)
+        v = None
+        for t in range(len(ys)):
+            vt = sub[ya[t, n]].astype(np.uint16)
+            vt *= 256 - wy[t, n]
+            vt += sub[yb[t, n]] * wy[t, n]
+            vt >>= 8
+            v = vt if v is None else (v + vt + 1) >> 1
+        # horitzontal
+        h = None
+        for t in range(len(xs)):
+            ht = v[:, xa[t, n]]
+            ht *= 256 - wx[t, n]
+            ht += v[:, xb[t, n]] * wx[t, n]
+            ht >>= 8
+            h = ht if h is None else (h + ht + 1) >> 1
+        out[n] = h
+    return out
+
+
+class KenBurns:
+    """
+    Moviment Ken Burns sobre una imatge: zoom (z0 → z1) i paneig opcional.
+
+    mode: "linear" (in o out), "pingpong" (in+out) o "tiktok"
+    (zoom amb easing smoothstep i paneig horitzontal sinusoidal).
+
+    zoom/pan/box accepten un instant o un array d'instants.
+    """
+
+    def __init__(
+        self,
+        source: ImagePyramid | Image.Image,
+        duration: float,
+        out_w: int,
+        out_h: int,
+        z0: float,
+        z1: float,
+        mode: str = "linear",
+        resample: int = Image.LANCZOS,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Mode Ken Burns desconegut: {mode}")
+
+        if isinstance(source, Image.Image):
+            source = ImagePyramid(source)
+
+        self.source = source
+        self.duration = duration
+        self.out_w = out_w
+        self.out_h = out_h
+        self.z0 = z0
+        self.z1 = z1
+        self.mode = mode
+        self.resample = resample
+
+        W0, H0 = source.size
+        # escala mínima per cobrir el canvas
+        self.scale_base = max(out_w / W0, out_h / H0)
+
+        # graelles de centres de píxel de sortida (0..1), per a frames(); les
+        # de croma (meitat de resolució) per a frames_yuv()
+        self._gx = (np.arange(out_w, dtype=np.float32) + 0.5) / out_w
+        self._gy = (np.arange(out_h, dtype=np.float32) + 0.5) / out_h
+        self._gxc = (np.arange(out_w // 2, dtype=np.float32) + 0.5) / (out_w // 2 or 1)
+        self._gyc = (np.arange(out_h // 2, dtype=np.float32) + 0.5) / (out_h // 2 or 1)
+
+    def progress(self, t):
+        return np.clip(np.asarray(t, dtype=float) / max(self.duration, 1e-6), 0.0, 1.0)
+
+    def zoom(self, t):
+        u = self.progress(t)
+        if self.mode == "pingpong":
+            return zoom_pingpong(u, self.z0, self.z1)
+        if self.mode == "tiktok":
+            return zoom_linear(smoothstep(u), self.z0, self.z1)
+        return zoom_linear(u, self.z0, self.z1)
+
+    def pan(self, t):
+        """Desplaçament horitzontal del centre, en fracció de l'amplada."""
+        u = self.progress(t)
+        if self.mode != "tiktok":
+            return np.zeros_like(u)
+        return TIKTOK_PAN * np.sin(np.pi * (u - 0.5))
+
+    def box(self, t):
+        """Caixa visible (x0, y0, x1, y1) a l'instant t, en coordenades de la font."""
+        W0, H0 = self.source.size
+        scale = self.scale_base * self.zoom(t)
+
+        bw = np.minimum(W0, self.out_w / scale)
+        bh = np.minimum(H0, self.out_h / scale)
+
+        cx = W0 / 2 + W0 * self.pan(t)
+        cy = H0 / 2
+
+        # clamp (el paneig no pot sortir de la imatge)
+        x0 = np.maximum(0.0, np.minimum(cx - bw / 2, W0 - bw))
+        y0 = np.maximum(0.0, np.minimum(cy - bh / 2, H0 - bh))
+        return x0, y0, x0 + bw, y0 + bh
+
+    def frame(self, t: float) -> np.ndarray:
+        scale = float(self.scale_base * self.zoom(t))
+        level, fx, fy = self.source.level_for(scale)
+
+        x0, y0, x1, y1 = (float(v) for v in self.box(t))
+        with stage("resize"):
+            img = level.resize(
+                (self.out_w, self.out_h), self.resample,
+                box=(x0 * fx, y0 * fy, x1 * fx, y1 * fy),
+            )
+            return np.asarray(img)
+
+    def frames(self, ts) -> np.ndarray:
+        """
+        Bloc (N, out_h, out_w, 3) uint8 per als instants `ts`.
+
+        Zoom, paneig i caixes es calculen com a arrays i el mostreig és
+        bilineal sobre graelles float32 (del nivell de piràmide que cobreix
+        cada frame), de manera que el càlcul del moviment es fa per bloc.
+        No és idèntic a frame() (LANCZOS): la diferència és petita però
+        visible en una comparació exacta (al voltant de 45 dB de PSNR).
+        """
+        ts = np.atleast_1d(np.asarray(ts, dtype=float))
+        out = np.empty((len(ts), self.out_h, self.out_w, 3), dtype=np.uint8)
+        return self._sample(ts, self.source.array, self._gx, self._gy, out)
+
+    def frames_yuv(self, ts) -> np.ndarray:
+        """
+        Bloc (N, bytes) de frames yuv420p: com frames(), però mostrejant
+        els plans Y i UV de cada nivell (yuv420.py) en lloc de l'RGB.
+        """
+        ts = np.atleast_1d(np.asarray(ts, dtype=float))
+        n = len(ts)
+        y = np.empty((n, self.out_h, self.out_w, 1), dtype=np.uint8)
+        uv = np.empty((n, self.out_h // 2, self.out_w // 2, 2), dtype=np.uint8)
+        self._sample(ts, lambda li: self.source.yuv(li)[0], self._gx, self._gy, y)
+        self._sample(ts, lambda li: self.source.yuv(li)[1], self._gxc, self._gyc, uv)
+        return pack_yuv420(y, uv)
+
+    def _sample(self, ts, plane, gx, gy, out) -> np.ndarray:
+        """Mostreja `plane(nivell)` a les graelles (gx, gy) de la caixa de cada t."""
+        W0, H0 = self.source.size
+        scales = self.scale_base * self.zoom(ts)
+        x0, y0, x1, y1 = self.box(ts)
+        levels = np.array([self.source.level_index(s) for s in scales])
+
+        for li in np.unique(levels):
+            sel = np.flatnonzero(levels == li)
+            src = plane(li)
+            fx, fy = src.shape[1] / W0, src.shape[0] / H0
+
+            xs = ((x0[sel] * fx)[:, None] + gx * ((x1[sel] - x0[sel]) * fx)[:, None]
+                  - 0.5).astype(np.float32)
+            ys = ((y0[sel] * fy)[:, None] + gy * ((y1[sel] - y0[sel]) * fy)[:, None]
+                  - 0.5).astype(np.float32)
+            with stage("resize_block"):
+                if len(sel) == len(ts):
+                    sample_bilinear(src, ys, xs, out=out)
+                else:
+                    out[sel] = sample_bilinear(src, ys, xs)
+        return out
+
+    def clip(self) -> VideoClip:
+        # sense get_frame(0) al constructor: la font es carrega al primer frame
+        clip = VideoClip(duration=self.duration)
+        clip.frame_function = self.frame
+        clip.size = (self.out_w, self.out_h)
+        clip.prefetch = getattr(self.source, "prefetch", None)
+        if self.out_w % 2 == 0 and self.out_h % 2 == 0:
+            with_yuv_block(clip, self.frames_yuv)
+        return with_frame_block(clip, self.frames)
+
+
+# ---------------------------
+# Blocs de frames
+# ---------------------------
+
+def with_frame_block(clip: VideoClip, frames_fn) -> VideoClip:
+    """
+    Associa a `clip` una funció ts -> (N, H, W, 3) uint8. Només és vàlida
+    mentre el clip conservi el mateix frame_function (els efectes de MoviePy
+    en creen un de nou i aleshores get_frame_block ja no la retorna).
+    """
+    clip.frame_block = frames_fn
+    clip.frame_block_of = clip.frame_function
+    return clip
+
+
+def get_frame_block(clip):
+    fn = getattr(clip, "frame_block", None)
+    if fn is not None and getattr(clip, "frame_block_of", None) is clip.frame_function:
+        return fn
+    return None
+
+
+def with_yuv_block(clip: VideoClip, frames_fn) -> VideoClip:
+    """Com with_frame_block, amb una funció ts -> (N, bytes) de frames yuv420p."""
+    clip.yuv_block = frames_fn
+    clip.yuv_block_of = clip.frame_function
+    return clip
+
+
+def get_yuv_block(clip):
+    fn = getattr(clip, "yuv_block", None)
+    if fn is not None and getattr(clip, "yuv_block_of", None) is clip.frame_function:
+        return fn
+    return None
+
+
+def frames_at(clip, ts) -> np.ndarray:
+    """Bloc de frames de qualsevol clip (frame a frame si no té API de blocs)."""
+    fn = get_frame_block(clip)
+    if fn is not None:
+        return fn(ts)
+    return np.stack([clip.get_frame(t) for t in ts])
+
+
+def timeline_frames(durations: list[float], fps: float) -> list[tuple[int, int]]:
+    """
+    Frames [i0, i1) de cada clip a la línia de temps concatenada: els
+    instants t = i / fps (i < int(total * fps), com write_videofile) amb
+    inici <= t < final, és a dir [ceil(inici * fps), ceil(final * fps)).
+    Amb durades fraccionàries, int(durada * fps) per clip es quedaria curt.
+    """
+    starts = np.cumsum([0.0] + list(durations))
+    ts = np.arange(int(starts[-1] * fps)) / fps
+    idx = np.searchsorted(ts, starts)
+    return [(int(idx[k]), int(idx[k + 1])) for k in range(len(durations))]
+
+
+def concatenate_clips(clips: list[VideoClip]) -> VideoClip:
+    """
+    Com concatenate_videoclips (method="chain") per a clips de la mateixa
+    mida, però busca el clip actiu amb searchsorted i exposa l'API de blocs
+    (també la yuv420p si tots els clips la tenen).
+    En entrar a un clip es precarrega la imatge del següent (clip.prefetch).
+    """
+    starts = np.cumsum([0.0] + [c.duration for c in clips])
+    last = len(clips) - 1
+    current = [-1]
+
+    def index(ts):
+        return np.clip(np.searchsorted(starts, ts, side="right") - 1, 0, last)
+
+    def enter(i):
+        if i != current[0]:
+            current[0] = i
+            prefetch = getattr(clips[i + 1], "prefetch", None) if i < last else None
+            if prefetch is not None:
+                prefetch()
+
+    def frame_function(t):
+        i = int(index(t))
+        enter(i)
+        return clips[i].get_frame(t - starts[i])
+
+    def gather(ts, fetch):
+        ts = np.atleast_1d(np.asarray(ts, dtype=float))
+        idx = index(ts)
+        out = None
+        for i in np.unique(idx):
+            enter(int(i))
+            sel = np.flatnonzero(idx == i)
+            block = fetch(clips[i], ts[sel] - starts[i])
+            if out is None:
+                out = np.empty((len(ts),) + block.shape[1:], dtype=np.uint8)
+            out[sel] = block
+        return out
+
+    clip = VideoClip(duration=float(starts[-1]))
+    clip.frame_function = frame_function
+    clip.size = clips[0].size
+    if all(get_yuv_block(c) is not None for c in clips):
+        with_yuv_block(clip, lambda ts: gather(ts, lambda c, t: get_yuv_block(c)(t)))
+    return with_frame_block(clip, lambda ts: gather(ts, frames_at))
+
+
+def ken_burns_clip(
+    img_path: Path,
+    duration: float,
+    out_w: int,
+    out_h: int,
+    z0: float,
+    z1: float,
+    mode: str = "linear",
+    resample: int = Image.LANCZOS,
+) -> VideoClip:
+    source = LazyPyramid(img_path, out_w, out_h, zmin=min(z0, z1), zmax=max(z0, z1))
+    kb = KenBurns(source, duration, out_w, out_h, z0, z1, mode=mode, resample=resample)
+    return kb.clip()
+
+
+def ken_burns_tiktok_clip(
+    img_path: Path,
+    duration: float,
+    out_w: int,
+    out_h: int,
+    z0: float,
+    z1: float,
+    resample: int = Image.LANCZOS,
+) -> VideoClip:
+    return ken_burns_clip(
+        img_path, duration, out_w, out_h, z0, z1, mode="tiktok", resample=resample
+    )
@@ -3,6 +3,11 @@ import subprocess
 import argparse
 import os
 import sys
+from pathlib import Path
+
+from batch_convert import PROFILES, add_batch_args, ffmpeg_cmd, run_from_args
+
+PROFILE = PROFILES["m4a2wav"]
 
 def convert_m4a_to_wav(input_file: str):
     if not os.path.isfile(input_file):
@@ -17,7 +22,7 @@ def convert_m4a_to_wav(input_file: str):
 
     try:
         subprocess.run(
-            ["ffmpeg", "-y", "-i", input_file, output_file],
+            ffmpeg_cmd(PROFILE, Path(input_file), Path(output_file)),
             check=True,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.STDOUT
@@ -28,7 +33,16 @@ def convert_m4a_to_wav(input_file: str):
         sys.exit(1)
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Convierte un archivo .m4a a .wav")
-    parser.add_argument("--file", required=True, help="Ruta del archivo .m4a a convertir")
+    parser = argparse.ArgumentParser(description="Convierte archivos .m4a a .wav")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--file", help="Ruta del archivo .m4a a convertir")
+    src.add_argument("--folder", help="Carpeta con archivos .m4a (conversión en lote)")
+    add_batch_args(parser)
     args = parser.parse_args()
-    convert_m4a_to_wav(args.file)
+    if args.file:
+        convert_m4a_to_wav(args.file)
+    else:
+        if not os.path.isdir(args.folder):
+            print(f"❌ La carpeta '{args.folder}' no existe.")
+            sys.exit(1)
+        run_from_args(PROFILE, [Path(args.folder)], args)
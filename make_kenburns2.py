@@ -3,9 +3,9 @@
 import argparse
 import json
 from pathlib import Path
-import numpy as np
-from PIL import Image
-from moviepy import VideoClip, concatenate_videoclips
+
+from frame_store import list_images
+from render_output import add_output_args, apply_draft, write_kenburns
 
 EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
 
@@ -49,42 +49,6 @@ def zoom_for_duration(duration: float,
     return 1.0, z1
 
 
-def ken_burns_clip(img_path, duration, out_w, out_h, z0, z1):
-    # carregam imatge base
-    base = Image.open(img_path).convert("RGB")
-    W0, H0 = base.size
-
-    # escala mínima per cobrir el canvas
-    scale_base = max(out_w / W0, out_h / H0)
-
-    def make_frame(t):
-        # zoom lineal
-        z = z0 + (z1 - z0) * (t / duration)
-        scale = scale_base * z
-
-        # mida escalada
-        new_w = int(W0 * scale)
-        new_h = int(H0 * scale)
-
-        # reescalar amb Pillow
-        img_resized = base.resize((new_w, new_h), Image.LANCZOS)
-        arr = np.array(img_resized)
-
-        # crop centrat
-        x_center = new_w // 2
-        y_center = new_h // 2
-
-        x1 = x_center - out_w // 2
-        y1 = y_center - out_h // 2
-        x2 = x1 + out_w
-        y2 = y1 + out_h
-
-        frame = arr[y1:y2, x1:x2].copy()
-        return frame
-
-    return VideoClip(make_frame, duration=duration)
-
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--folder", required=True)
@@ -96,10 +60,12 @@ def main():
                     help="durada per imatge si NO es passa JSON")
     ap.add_argument("--json-durations", type=str,
                     help="path a image_prompts_all.json")
+    add_output_args(ap, kenburns=True)
     args = ap.parse_args()
+    apply_draft(args)
 
     folder = Path(args.folder)
-    imgs = sorted([p for p in folder.iterdir() if p.suffix.lower() in EXTS])
+    imgs = list_images(folder, EXTS)
 
     # durades
     if args.json_durations:
@@ -110,7 +76,7 @@ def main():
     if len(durs) < len(imgs):
         print(f"[WARN] hi ha més imatges ({len(imgs)}) que durades ({len(durs)}). "
               f"Les sobrants usaran {args.duration}s.")
-    clips = []
+    specs = []
     for i, img in enumerate(imgs):
         dur = durs[i] if i < len(durs) else args.duration
 
@@ -121,19 +87,17 @@ def main():
         else:
             z0, z1 = z_in_1, z_in_0          # zoom OUT
 
-        clips.append(
-            ken_burns_clip(
-                img,
+        specs.append(
+            dict(
+                img_path=img,
                 duration=dur,
-                out_w=args.width,
-                out_h=args.height,
                 z0=z0,
                 z1=z1,
+                mode="linear",
             )
         )
 
-    final = concatenate_videoclips(clips)
-    final.write_videofile(args.out, fps=args.fps, codec="libx264", audio=False)
+    write_kenburns(specs, args.out, args.fps, args.width, args.height, args)
 
 
 if __name__ == "__main__":
@@ -5,9 +5,8 @@ import argparse
 import json
 from pathlib import Path
 
-import numpy as np
-from PIL import Image
-from moviepy import VideoClip, concatenate_videoclips
+from frame_store import list_images
+from render_output import add_output_args, apply_draft, write_kenburns
 
 EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
 
@@ -52,62 +51,6 @@ def zoom_for_duration(duration: float,
     return 1.0, z1
 
 
-def ken_burns_clip(
-    img_path,
-    duration: float,
-    out_w: int,
-    out_h: int,
-    z0: float,
-    z1: float,
-    mode: str = "linear",   # "linear" o "pingpong"
-) -> VideoClip:
-    base = Image.open(img_path).convert("RGB")
-    W0, H0 = base.size
-
-    # escala mínima per cobrir el canvas
-    scale_base = max(out_w / W0, out_h / H0)
-
-    def zoom_factor(t: float) -> float:
-        u = t / max(duration, 0.0001)  # 0..1
-
-        if mode == "pingpong":
-            # 0..0.5 → zoom in ; 0.5..1 → zoom out
-            if u <= 0.5:
-                v = u / 0.5
-                z = z0 + (z1 - z0) * v
-            else:
-                v = (u - 0.5) / 0.5
-                z = z1 - (z1 - z0) * v
-        else:
-            # linear (només in o només out)
-            z = z0 + (z1 - z0) * u
-
-        return z
-
-    def make_frame(t: float):
-        z = zoom_factor(t)
-        scale = scale_base * z
-
-        new_w = int(W0 * scale)
-        new_h = int(H0 * scale)
-
-        img_resized = base.resize((new_w, new_h), Image.LANCZOS)
-        arr = np.array(img_resized)
-
-        x_center = new_w // 2
-        y_center = new_h // 2
-
-        x1 = x_center - out_w // 2
-        y1 = y_center - out_h // 2
-        x2 = x1 + out_w
-        y2 = y1 + out_h
-
-        frame = arr[y1:y2, x1:x2].copy()
-        return frame
-
-    return VideoClip(make_frame, duration=duration)
-
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--folder", required=True, help="Carpeta amb les imatges")
@@ -125,10 +68,12 @@ def main():
         default="linear",
         help="Tipus de moviment: linear o pingpong (in+out)",
     )
+    add_output_args(ap, kenburns=True)
     args = ap.parse_args()
+    apply_draft(args)
 
     folder = Path(args.folder)
-    imgs = sorted([p for p in folder.iterdir() if p.suffix.lower() in EXTS])
+    imgs = list_images(folder, EXTS)
 
     if not imgs:
         raise SystemExit(f"No s'han trobat imatges a {folder}")
@@ -145,7 +90,7 @@ def main():
             f"les sobrants usaran {args.duration}s."
         )
 
-    clips = []
+    specs = []
     for i, img in enumerate(imgs):
         dur = durations[i] if i < len(durations) else args.duration
 
@@ -161,20 +106,17 @@ def main():
             # en pingpong sempre fem in+out a la mateixa imatge
             z0, z1 = z_in_0, z_in_1
 
-        clips.append(
-            ken_burns_clip(
+        specs.append(
+            dict(
                 img_path=img,
                 duration=dur,
-                out_w=args.width,
-                out_h=args.height,
                 z0=z0,
                 z1=z1,
                 mode=args.mode,
             )
         )
 
-    final = concatenate_videoclips(clips)
-    final.write_videofile(args.out, fps=args.fps, codec="libx264", audio=False)
+    write_kenburns(specs, args.out, args.fps, args.width, args.height, args)
 
 
 if __name__ == "__main__":
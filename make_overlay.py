@@ -4,100 +4,86 @@
 import argparse
 from pathlib import Path
 
-import numpy as np
-from PIL import Image
-from moviepy import VideoClip, VideoFileClip, concatenate_videoclips
+from moviepy import VideoClip
 
-EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
-
-
-def ken_burns_tiktok_clip(img_path, duration, out_w, out_h, z0, z1):
-    base = Image.open(img_path).convert("RGB")
-    W0, H0 = base.size
-
-    # escala mínima per cobrir el canvas
-    scale_base = max(out_w / W0, out_h / H0)
-
-    def make_frame(t):
-        s = t / duration  # 0→1
-
-        # easing suau
-        ease = s * s * (3 - 2 * s)
-
-        # zoom
-        zoom = z0 + (z1 - z0) * ease
-        scale = scale_base * zoom
-
-        new_w = int(W0 * scale)
-        new_h = int(H0 * scale)
-        img_resized = base.resize((new_w, new_h), Image.LANCZOS)
-        arr = np.array(img_resized)
-
-        # paneig horitzontal
-        pan_amp = int(new_w * 0.12)
-        pan = np.sin(np.pi * (s - 0.5))
-        x_center = new_w // 2 + int(pan_amp * pan)
-        y_center = new_h // 2
-
-        x1 = x_center - out_w // 2
-        y1 = y_center - out_h // 2
-        x1 = max(0, min(x1, new_w - out_w))
-        y1 = max(0, min(y1, new_h - out_h))
-        x2 = x1 + out_w
-        y2 = y1 + out_h
+from blend_kernels import BLEND_MODES, Blender
+from ffmpeg_overlay import overlay_writer_args
+from frame_store import list_images
+from ingest import ingest_from_args
+from kenburns_engine import concatenate_clips, frames_at, ken_burns_tiktok_clip, with_frame_block
+from overlay_cache import loop_index, overlay_frames
+from profiling import stage
+from render_output import add_output_args, apply_draft, write_video
 
-        frame = arr[y1:y2, x1:x2].copy()
-        return frame
-
-    return VideoClip(make_frame, duration=duration)
+EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
 
 
 def blend_with_overlay(base_clip: VideoClip,
                        overlay_path: Path,
+                       fps: float,
                        mode: str = "screen",
-                       opacity: float = 0.9) -> VideoClip:
-    """Superposa l'overlay fent-lo loop durant TOTA la durada del base."""
-    ov = VideoFileClip(str(overlay_path))
+                       opacity: float = 0.9,
+                       cache_dir: Path | None = None) -> VideoClip:
+    """
+    Superposa l'overlay fent-lo loop durant TOTA la durada del base.
+    L'overlay es descodifica una vegada a la mida i fps del base
+    (overlay_cache.py) i el loop només indexa el memmap. La fusió es fa en
+    aritmètica entera (blend_kernels.py).
+    """
+    ov = overlay_frames(overlay_path, base_clip.size, fps, cache_dir)
+
+    blend = Blender(mode, opacity)
 
     def make_frame(t):
-        fb = base_clip.get_frame(t).astype(float) / 255.0
         # loop de l'overlay
-        fo = ov.get_frame(t % ov.duration).astype(float) / 255.0
-
-        fo = fo * opacity
-
-        if mode == "normal":
-            out = fb * (1.0 - opacity) + fo
-        else:
-            # SCREEN: fons negre a l'overlay
-            out = 1.0 - (1.0 - fb) * (1.0 - fo)
-
-        return (out * 255.0).clip(0, 255).astype("uint8")
+        base = base_clip.get_frame(t)
+        with stage("blend"):
+            return blend(base, ov[loop_index(t, fps, len(ov))])
+
+    def frames(ts):
+        # el bloc base és nou: es fusiona in-place, frame a frame sobre el memmap
+        fb = frames_at(base_clip, ts)
+        with stage("blend"):
+            for k, i in enumerate(loop_index(ts, fps, len(ov))):
+                blend(fb[k], ov[i], out=fb[k])
+        return fb
 
     # ara dura igual que el Ken Burns amb totes les fotos
-    return VideoClip(make_frame, duration=base_clip.duration)
+    clip = VideoClip(make_frame, duration=base_clip.duration)
+    return with_frame_block(clip, frames)
 
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--folder", required=True, help="Carpeta d’imatges")
-    ap.add_argument("--overlay", required=True, help="Vídeo overlay .mp4/.mov")
+    ap.add_argument("--overlay", default=None,
+                    help="Vídeo overlay .mp4/.mov (no cal amb --skip-overlay)")
     ap.add_argument("--out", default="kenburns_overlay.mp4")
     ap.add_argument("--width", type=int, default=1920)
     ap.add_argument("--height", type=int, default=1080)
     ap.add_argument("--fps", type=int, default=30)
     ap.add_argument("--duration", type=float, default=6)
     ap.add_argument("--opacity", type=float, default=0.9)
-    ap.add_argument("--blend", choices=["normal", "screen"], default="screen")
+    ap.add_argument("--blend", choices=BLEND_MODES, default="screen")
+    ap.add_argument("--overlay-cache", default=None,
+                    help="Carpeta del cache de frames de l'overlay "
+                         "(per defecte, overlay_cache al directori temporal)")
+    add_output_args(ap, overlay=True)
     args = ap.parse_args()
+    if args.overlay is None and not args.skip_overlay:
+        ap.error("cal --overlay (o --skip-overlay)")
+    apply_draft(args)
 
     folder = Path(args.folder)
-    imgs = sorted([p for p in folder.iterdir() if p.suffix.lower() in EXTS])
+    imgs = list_images(folder, EXTS)
 
     if not imgs:
         raise SystemExit(f"No s'han trobat imatges a {folder}")
 
+    # --ingest: sense retall, amb marge per al zoom màxim (1.25)
+    imgs = ingest_from_args(args, imgs, args.width, args.height, headroom=1.25, crop=False)
+
     clips = []
     for i, img in enumerate(imgs):
         # alterna zoom in / zoom out com al teu script
@@ -114,18 +100,33 @@ def main():
                 out_h=args.height,
                 z0=z0,
                 z1=z1,
+                resample=args.resample,
             )
         )
 
-    base = concatenate_videoclips(clips)
+    base = concatenate_clips(clips)
+
+    if args.skip_overlay:
+        write_video(base, args.out, args.fps, args)
+        return
+
+    if args.backend == "ffmpeg":
+        # Python només calcula el base; loop i blend dins d'ffmpeg
+        writer_args = overlay_writer_args(Path(args.overlay), (args.width, args.height),
+                                          args.fps, mode=args.blend, opacity=args.opacity)
+        write_video(base, args.out, args.fps, args, writer_args=writer_args)
+        return
+
     final = blend_with_overlay(
         base_clip=base,
         overlay_path=Path(args.overlay),
+        fps=args.fps,
         mode=args.blend,
         opacity=args.opacity,
+        cache_dir=args.overlay_cache,
     )
 
-    final.write_videofile(args.out, fps=args.fps, codec="libx264", audio=False)
+    write_video(final, args.out, args.fps, args)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,8 @@ import subprocess
 from pathlib import Path
 import shlex
 
+from render_output import add_draft_args, apply_draft
+
 IMG_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
 
 def run(cmd: list[str]) -> None:
@@ -24,7 +26,10 @@ def main():
     ap.add_argument("--w", type=int, default=1280, help="Ancho salida (default: 1280)")
     ap.add_argument("--h", type=int, default=720, help="Alto salida (default: 720)")
     ap.add_argument("--sort", choices=["name", "mtime"], default="name", help="Orden de imágenes")
+    add_draft_args(ap)
     args = ap.parse_args()
+    # --draft: misma duración, salida reducida, fps limitado y preset ultrafast
+    apply_draft(args, size=("w", "h"))
 
     folder = Path(args.folder).expanduser().resolve()
     out = Path(args.out).expanduser().resolve()
@@ -67,6 +72,7 @@ def main():
         "-i", str(concat_txt),
         "-vf", vf,
         "-c:v", "libx264",
+        "-preset", args.preset,
         "-crf", "20",
         "-pix_fmt", "yuv420p",
         "-movflags", "+faststart",
@@ -7,16 +7,18 @@ import argparse
 import json
 from pathlib import Path
 
-import numpy as np
-from PIL import Image
-
 from moviepy import (
     ImageClip,
-    VideoClip,
-    CompositeVideoClip,
     vfx,
 )
 
+from compositor import composite_clips
+from frame_store import StoreFrame, is_store, list_images
+from ingest import ingest_from_args, load_image
+from kenburns_engine import ken_burns_clip
+from render_output import add_output_args, apply_draft, write_video
+from segment_render import plan_spans, write_spans
+
 EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
 
 
@@ -52,57 +54,9 @@ def zoom_for_duration(duration: float, zmin: float, zmax: float) -> tuple[float,
     z1 = max(zmin, min(zmax, ideal))
     return 1.0, z1
 
-def ken_burns_clip(
-    img_path: Path,
-    duration: float,
-    out_w: int,
-    out_h: int,
-    z0: float,
-    z1: float,
-    mode: str = "linear",   # linear | pingpong
-) -> VideoClip:
-    base = Image.open(img_path).convert("RGB")
-    W0, H0 = base.size
-    scale_base = max(out_w / W0, out_h / H0)  # cover
-
-    def zoom_factor(t: float) -> float:
-        u = t / max(duration, 1e-6)
-        if mode == "pingpong":
-            if u <= 0.5:
-                v = u / 0.5
-                return z0 + (z1 - z0) * v
-            v = (u - 0.5) / 0.5
-            return z1 - (z1 - z0) * v
-        return z0 + (z1 - z0) * u
-
-    def make_frame(t: float):
-        z = zoom_factor(t)
-        scale = scale_base * z
-
-        new_w = max(1, int(W0 * scale))
-        new_h = max(1, int(H0 * scale))
-
-        img_resized = base.resize((new_w, new_h), Image.LANCZOS)
-        arr = np.asarray(img_resized)
-
-        x_center = new_w // 2
-        y_center = new_h // 2
-
-        x1 = x_center - out_w // 2
-        y1 = y_center - out_h // 2
-
-        # clamp (por seguridad ante redondeos)
-        x1 = max(0, min(x1, new_w - out_w))
-        y1 = max(0, min(y1, new_h - out_h))
-
-        frame = arr[y1:y1 + out_h, x1:x1 + out_w].copy()
-        return frame
-
-    return VideoClip(make_frame, duration=duration)
-
 
 # ---------------------------
-# Utilidades: cover/crop + zoom simple
+# Utilidades: cover/crop
 # ---------------------------
 
 def cover_crop(clip, w: int, h: int):
@@ -111,25 +65,6 @@ def cover_crop(clip, w: int, h: int):
         c = c.resized(width=w)
     return c.cropped(x_center=c.w/2, y_center=c.h/2, width=w, height=h)
 
-def apply_zoom_motion(clip, motion: str, z0: float, z1: float):
-    if motion == "none":
-        return clip
-    if motion == "zoom_in":
-        a, b = z0, z1
-    elif motion == "zoom_out":
-        a, b = z1, z0
-    else:
-        return clip
-
-    dur = clip.duration
-
-    def factor(t):
-        if dur <= 0:
-            return a
-        return a + (b - a) * (t / dur)
-
-    return clip.with_effects([vfx.Resize(factor)])
-
 
 # ---------------------------
 # Transiciones: fade + slide
@@ -183,7 +118,9 @@ def main():
     ap.add_argument("--transition", choices=["none", "fade", "slide_left", "slide_right"], default="none")
     ap.add_argument("--tlen", type=float, default=1.0, help="Duración transición")
 
-    ap.add_argument("--motion", choices=["none", "zoom_in", "zoom_out", "kenburns"], default="none")
+    ap.add_argument("--motion", choices=["none", "zoom_in", "zoom_out", "kenburns"], default="none",
+                    help="zoom_in: zoom de --z0 a --z1 sobre la imagen a pantalla completa; "
+                         "zoom_out: de --z1 a --z0")
     ap.add_argument("--z0", type=float, default=1.00)
     ap.add_argument("--z1", type=float, default=1.12)
 
@@ -191,14 +128,16 @@ def main():
     ap.add_argument("--kb_zmin", type=float, default=1.08)
     ap.add_argument("--kb_zmax", type=float, default=1.35)
 
+    add_output_args(ap, segments=True)
     args = ap.parse_args()
+    apply_draft(args, size=("w", "h"))
 
     folder = Path(args.folder)
-    if not folder.is_dir():
+    if not folder.is_dir() and not is_store(folder):
         raise SystemExit("La carpeta no existe")
 
-    imgs = sorted([p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in EXTS],
-                  key=lambda p: p.name.lower())
+    # carpeta de imágenes o almacén de frames de extract_frames --format store
+    imgs = list_images(folder, EXTS, key=lambda p: p.name.lower())
     if not imgs:
         raise SystemExit("No hay imágenes")
 
@@ -215,6 +154,13 @@ def main():
         if args.tlen >= min(durs):
             raise SystemExit("--tlen debe ser menor que la menor duración de imagen (por overlap).")
 
+    # --ingest: imágenes ya orientadas y a tamaño (cache compartido)
+    if args.motion == "none":
+        srcs = ingest_from_args(args, imgs, args.w, args.h)
+    else:
+        headroom = args.kb_zmax if args.motion == "kenburns" else max(args.z0, args.z1)
+        srcs = ingest_from_args(args, imgs, args.w, args.h, headroom=headroom, crop=False)
+
     outgoing_pos, incoming_pos = slide_position_functions(args.w, args.transition, args.tlen)
 
     # starts con overlap
@@ -238,19 +184,35 @@ def main():
                 z0, z1 = z_in_0, z_in_1
 
             c = ken_burns_clip(
-                img_path=img,
+                img_path=srcs[i],
                 duration=dur,
                 out_w=args.w,
                 out_h=args.h,
                 z0=z0,
                 z1=z1,
                 mode=args.kb_mode,
+                resample=args.resample,
+            )
+        elif args.motion in ("zoom_in", "zoom_out"):
+            # zoom simple con el mismo motor (solo se remuestrea la zona visible).
+            # Cambio visible respecto a la versión antigua: allí el cover_crop
+            # final reescalaba a la altura de salida y anulaba casi todo el zoom.
+            z0, z1 = (args.z0, args.z1) if args.motion == "zoom_in" else (args.z1, args.z0)
+            c = ken_burns_clip(
+                img_path=srcs[i],
+                duration=dur,
+                out_w=args.w,
+                out_h=args.h,
+                z0=z0,
+                z1=z1,
+                resample=args.resample,
             )
+        elif args.ingest:
+            c = ImageClip(load_image(srcs[i])).with_duration(dur)
         else:
-            c = ImageClip(str(img)).with_duration(dur)
+            c = ImageClip(load_image(img) if isinstance(img, StoreFrame) else str(img))
+            c = c.with_duration(dur)
             c = cover_crop(c, args.w, args.h)
-            c = apply_zoom_motion(c, args.motion, args.z0, args.z1)
-            c = cover_crop(c, args.w, args.h)  # seguridad
 
         # --- transición ---
         c = apply_transition_fx(c, args.transition, args.tlen)
@@ -272,8 +234,18 @@ def main():
         c = c.with_start(starts[i])
         clips.append(c)
 
-    final = CompositeVideoClip(clips, size=(args.w, args.h))
-    final.write_videofile(args.out, fps=args.fps, codec="libx264", audio=False)
+    final = composite_clips(clips, size=(args.w, args.h))
+
+    if args.segments > 0:
+        # trams entre els límits de starts: un sol clip (sense composició)
+        # o el solapament de la transició; cada un és un segment
+        ends = [starts[i] + float(durs[i]) for i in range(len(imgs))]
+        spans = plan_spans(starts, ends, args.fps)
+        write_spans(final, spans, args.out, args.fps, args.segments, batch=args.batch,
+                    preset=args.preset)
+        return
+
+    write_video(final, args.out, args.fps, args)
 
 if __name__ == "__main__":
     main()
@@ -5,20 +5,55 @@ import argparse
 from pathlib import Path
 EXTS = {".png", ".jpg", ".jpeg", ".webp"}
 
-from moviepy import ImageClip, concatenate_videoclips
+from moviepy import ImageClip
 
-def concatenar_imatges(img_dir: Path, seconds_per_image: float, output_file: Path, gap: float = 0.6):
-    images = sorted([p for p in img_dir.iterdir() if p.suffix.lower() in {".png", ".jpg", ".jpeg", ".webp"}])
+from compositor import composite_clips
+from frame_store import StoreFrame, list_images
+from ingest import ingest_from_args, load_image
+from render_output import DRAFT_FPS, add_output_args, apply_draft, write_clip
+
+def concatenar_imatges(img_dir: Path, seconds_per_image: float, output_file: Path, gap: float = 0.6,
+                       args=None):
+    """
+    Les opcions de sortida (add_output_args: backend, workers, static,
+    ingest amb width/height, draft, preset) venen de `args`; sense `args`,
+    les de per defecte (moviepy, 24 fps, preset medium).
+    """
+    backend = getattr(args, "backend", "moviepy")
+    workers = getattr(args, "workers", 1)
+    static = getattr(args, "static", "off")
+    draft = getattr(args, "draft", False)
+    images = list_images(img_dir, EXTS)
     if not images:
         raise SystemExit(f"⚠️ No s'han trobat imatges a: {img_dir}")
 
     # Un clip per imatge, sense efectes (MoviePy v2)
-    clips = [ImageClip(str(p)).with_duration(seconds_per_image) for p in images]
+    if getattr(args, "ingest", False):
+        # totes a la mateixa mida (cover + retall), preparades en paral·lel
+        images = ingest_from_args(args, images, args.width, args.height)
+        clips = [ImageClip(load_image(p)).with_duration(seconds_per_image) for p in images]
+    else:
+        clips = [ImageClip(load_image(p) if isinstance(p, StoreFrame) else str(p))
+                 .with_duration(seconds_per_image) for p in images]
+        if draft:
+            # esborrany: imatges reduïdes una sola vegada (ImageClip estàtic)
+            clips = [c.resized(args.draft_scale) for c in clips]
+
+    # Concatena amb un espai negre entre clips (gap en segons), centrats com
+    # concatenate_videoclips(method="compose", padding=gap)
+    size = (max(c.w for c in clips), max(c.h for c in clips))
+    clips = [c.with_start(i * (seconds_per_image + gap)).with_position("center")
+             for i, c in enumerate(clips)]
+    video = composite_clips(clips, size=size)
 
-    # Concatena amb un espai negre entre clips (gap en segons)
-    video = concatenate_videoclips(clips, method="compose", padding=gap)
+    fps = min(24, DRAFT_FPS) if draft else 24
+    preset = getattr(args, "preset", "medium")
 
-    video.write_videofile(str(output_file), fps=24)
+    if backend == "moviepy" and workers <= 1 and static == "off":
+        video.write_videofile(str(output_file), fps=fps, preset=preset)
+    else:
+        write_clip(video, output_file, fps, backend=backend, workers=workers, static=static,
+                   preset=preset)
     print(f"✅ Vídeo creat amb tall negre de {gap}s entre fotos: {output_file}")
 
 
@@ -30,8 +65,17 @@ def main():
     ap.add_argument("--out", default="sortida.mp4", help="Fitxer de sortida")
     ap.add_argument("--fade", type=float, default=0.8, help="Durada del fade (seg.)")
     ap.add_argument("--gap", type=float, default=0.6, help="Durada del tall negre entre fotos (s)")
+    ap.add_argument("--width", type=int, default=None,
+                    help="Amb --ingest: amplada a què es normalitzen les imatges")
+    ap.add_argument("--height", type=int, default=None,
+                    help="Amb --ingest: alçada a què es normalitzen les imatges")
+    add_output_args(ap)
 
     args = ap.parse_args()
+    if args.ingest and (args.width is None or args.height is None):
+        ap.error("--ingest necessita --width i --height")
+    # l'fps és fix (24): concatenar_imatges el limita amb --draft
+    apply_draft(args, fps=None)
 
     img_dir = Path(args.img_dir)
     if not img_dir.exists():
@@ -40,7 +84,7 @@ def main():
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
 
-    concatenar_imatges(img_dir, args.seconds, out, gap=args.gap)
+    concatenar_imatges(img_dir, args.seconds, out, gap=args.gap, args=args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# overlay_cache.py
+"""
+Cache de frames d'overlay descodificats.
+
+L'overlay es descodifica una sola vegada amb ffmpeg, ja reescalat a la mida
+i fps de sortida, a un fitxer rgb24 cru. Es reutilitza amb np.memmap: fer
+loop és només indexar (i % N), sense seeks ni re-descodificar.
+
+La clau del fitxer és el hash del contingut de l'overlay + w, h i fps, així
+que el cache serveix entre execucions i es regenera si canvia l'overlay.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from file_utils import file_hash
+from profiling import stage
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "overlay_cache"
+
+
+def _decode(src: Path, dst: Path, size: tuple[int, int], fps: float) -> None:
+    w, h = size
+    # primer a un temporal: un fitxer a mitges mai queda com a cache vàlid
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    cmd = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "error",
+        "-i", str(src),
+        "-an",
+        "-vf", f"fps={fps}:round=down,scale={w}:{h}:flags=bicubic",
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        str(tmp),
+    ]
+    with stage("overlay_decode"):
+        p = subprocess.run(cmd, capture_output=True, text=True)
+    if p.returncode != 0 or not tmp.exists() or tmp.stat().st_size == 0:
+        tmp.unlink(missing_ok=True)
+        raise SystemExit(p.stderr.strip() or f"No s'ha pogut descodificar {src}")
+    os.replace(tmp, dst)
+
+
+def overlay_frames(overlay_path: Path, size: tuple[int, int], fps: float,
+                   cache_dir: Path | None = None) -> np.ndarray:
+    """
+    Frames de l'overlay com a memmap (N, h, w, 3) uint8 de només lectura:
+    el frame i correspon a t = i / fps.
+    """
+    overlay_path = Path(overlay_path)
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    w, h = size
+    key = file_hash(overlay_path)[:32]
+    path = cache_dir / f"{key}_{w}x{h}_{fps:g}fps.rgb"
+    if path.exists():
+        print(f"[OK] overlay en cache: {path}")
+    else:
+        _decode(overlay_path, path, size, fps)
+        print(f"[OK] overlay descodificat a {path}")
+
+    frames = np.memmap(path, dtype=np.uint8, mode="r")
+    return frames.reshape(-1, h, w, 3)
+
+
+def loop_index(ts, fps: float, n_frames: int):
+    """Índex del frame de l'overlay (en loop) per a cada instant de `ts`."""
+    # el mateix epsilon que fa servir MoviePy per triar el frame
+    return np.floor(np.asarray(ts, dtype=float) * fps + 1e-6).astype(int) % n_frames
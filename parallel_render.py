@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# parallel_render.py
+"""
+Render de frames en paral·lel per als clips dels scripts make_*.
+
+Els workers (processos creats amb fork, de manera que hereten els closures de
+ken_burns_clip / blend_with_overlay sense pickle) calculen blocs de frames
+consecutius i els escriuen en un ring buffer de multiprocessing.shared_memory.
+El procés principal els envia a l'encoder en ordre. Pels Queue només hi
+passen índexs (frame inicial, nombre de frames, slot), mai arrays.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ffmpeg_pipe import FFmpegPipeWriter, write_clip_pipe
+from kenburns_engine import frames_at
+from profiling import flush, stage
+
+# clip que renderitzen els workers (heretat pel fork)
+_CLIP = None
+
+# cada quant es comprova, mentre s'espera un bloc, que els workers són vius
+WORKER_POLL_S = 1.0
+
+
+def _worker(shm_name, shape, fps, batch, tasks, done):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            start, count, slot = task
+            try:
+                if batch:
+                    ts = np.arange(start, start + count) / fps
+                    with stage("frame_block"):
+                        ring[slot:slot + count] = frames_at(_CLIP, ts)
+                else:
+                    for k in range(count):
+                        with stage("frame"):
+                            ring[slot + k] = _CLIP.get_frame((start + k) / fps)
+            except Exception:
+                done.put(("error", traceback.format_exc()))
+                break
+            flush()
+            done.put(("ok", task))
+    finally:
+        shm.close()
+
+
+def write_videofile_parallel(clip, filename: str, fps: float, workers: int,
+                             codec: str = "libx264", chunk: int = 8,
+                             preset: str = "medium",
+                             ffmpeg_params: list[str] | None = None,
+                             batch: bool = False, writer_args: dict | None = None) -> None:
+    """
+    Equivalent a clip.write_videofile(filename, fps=fps, codec=codec,
+    audio=False) però amb `workers` processos calculant frames.
+    Amb batch=True cada bloc es demana sencer (kenburns_engine.frames_at).
+    `writer_args` es passa a FFmpegPipeWriter.
+    """
+    global _CLIP
+
+    if "fork" not in mp.get_all_start_methods():
+        print("[WARN] sense fork en aquesta plataforma; render en sèrie.")
+        if writer_args:
+            write_clip_pipe(clip, filename, fps, codec=codec, preset=preset,
+                            ffmpeg_params=ffmpeg_params, writer_args=writer_args)
+        else:
+            clip.write_videofile(filename, fps=fps, codec=codec, preset=preset, audio=False,
+                                 ffmpeg_params=ffmpeg_params)
+        return
+
+    ctx = mp.get_context("fork")
+    n_frames = int(clip.duration * fps)
+    w, h = clip.size
+
+    # ring: 2 blocs per worker perquè mai esperin l'encoder
+    n_blocks = max(2, 2 * workers)
+    shape = (n_blocks * chunk, h, w, 3)
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+    tasks = ctx.Queue()
+    done = ctx.Queue()
+    _CLIP = clip
+    procs = [
+        ctx.Process(target=_worker, args=(shm.name, shape, fps, batch, tasks, done), daemon=True)
+        for _ in range(workers)
+    ]
+    writer = FFmpegPipeWriter(filename, (w, h), fps, codec=codec, preset=preset,
+                              ffmpeg_params=ffmpeg_params, **(writer_args or {}))
+
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        for p in procs:
+            p.start()
+
+        starts = list(range(0, n_frames, chunk))
+        sent = 0       # blocs enviats als workers
+        written = 0    # blocs escrits a l'encoder
+        ready = {}
+
+        def send(i):
+            start = starts[i]
+            count = min(chunk, n_frames - start)
+            tasks.put((start, count, (i % n_blocks) * chunk))
+
+        while sent < min(n_blocks, len(starts)):
+            send(sent)
+            sent += 1
+
+        while written < len(starts):
+            try:
+                status, payload = done.get(timeout=WORKER_POLL_S)
+            except queue.Empty:
+                # un worker mort (OOM, SIGKILL) no avisa: sense això s'espera per sempre
+                dead = [p for p in procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Un worker de render ha acabat sense respondre "
+                                       f"(exitcode={dead[0].exitcode})")
+                continue
+            if status == "error":
+                raise RuntimeError(f"Error en un worker de render:\n{payload}")
+            start, count, slot = payload
+            ready[start] = (count, slot)
+
+            # escrivim en ordre tot el que ja està llest
+            while written < len(starts) and starts[written] in ready:
+                count, slot = ready.pop(starts[written])
+                writer.write_frames(ring[slot:slot + count])
+                written += 1
+                # el slot alliberat ja pot rebre el bloc següent
+                if sent < len(starts):
+                    send(sent)
+                    sent += 1
+        ok = True
+    finally:
+        for _ in procs:
+            tasks.put(None)
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        if ok:
+            writer.close()
+        else:
+            writer.abort()
+        _CLIP = None
+        del ring
+        shm.close()
+        shm.unlink()
+
+    elapsed = time.perf_counter() - t0
+    print(f"[OK] {filename}: {n_frames} frames en {elapsed:.1f}s "
+          f"({n_frames / max(elapsed, 1e-9):.1f} fps, {workers} workers)")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# profiling.py
+"""
+Perfil per etapes dels renders (--profile TRACE.json als scripts make_*).
+
+Les etapes (descodificació, resize, composició, blend, espera de la pipe
+d'ffmpeg...) s'instrumenten amb `with stage("nom"):`. Sense --profile,
+stage() retorna sempre el mateix context buit: el cost és una crida.
+
+Amb --profile, cada etapa es guarda com a esdeveniment (inici, durada,
+procés, fil) i en sortir s'escriu un JSON en format Chrome trace (obrible a
+chrome://tracing o a ui.perfetto.dev) i es mostra una taula resum amb la
+mitjana i el p95 de cada etapa i el cost per frame. Els processos fills
+(fork) desen els seus esdeveniments amb flush() i el procés principal els
+ajunta al final.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+_PROFILER = None
+_NULL = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.events.append((self.name, self.t0, time.perf_counter_ns(),
+                                     threading.get_native_id()))
+        return False
+
+
+class Profiler:
+    """Esdeveniments (etapa, inici, final, fil) d'aquest procés i frames escrits."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.parts = self.path.with_name(f".{self.path.name}.parts")
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter_ns()
+        self.events = []
+        self.frames = 0
+        self._flushes = 0
+
+    def _after_fork(self) -> None:
+        self.events = []
+        self.frames = 0
+        self._flushes = 0
+
+    def flush(self) -> None:
+        """En un procés fill, desa els esdeveniments pendents per al procés principal."""
+        if os.getpid() == self.pid or not (self.events or self.frames):
+            return
+        self.parts.mkdir(parents=True, exist_ok=True)
+        part = self.parts / f"{os.getpid()}_{self._flushes}.json"
+        part.write_text(json.dumps(dict(pid=os.getpid(), frames=self.frames,
+                                        events=self.events)))
+        self._flushes += 1
+        self.events = []
+        self.frames = 0
+
+    def _collect(self) -> tuple[list, int]:
+        """Esdeveniments (amb pid) de tots els processos i total de frames."""
+        events = [(self.pid, *e) for e in self.events]
+        frames = self.frames
+        if self.parts.is_dir():
+            for part in sorted(self.parts.glob("*.json")):
+                data = json.loads(part.read_text())
+                events += [(data["pid"], *e) for e in data["events"]]
+                frames += data["frames"]
+            shutil.rmtree(self.parts, ignore_errors=True)
+        return events, frames
+
+    def save(self) -> None:
+        """Escriu el Chrome trace i mostra el resum (només al procés principal)."""
+        if os.getpid() != self.pid:
+            return
+        events, frames = self._collect()
+        trace = [dict(name=name, cat="render", ph="X", pid=pid, tid=tid,
+                      ts=(t0 - self.t0) / 1000, dur=(t1 - t0) / 1000)
+                 for pid, name, t0, t1, tid in events]
+        trace += [dict(name="process_name", ph="M", pid=pid,
+                       args=dict(name="principal" if pid == self.pid else f"worker {pid}"))
+                  for pid in sorted({e[0] for e in events})]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(dict(traceEvents=trace, displayTimeUnit="ms")))
+        print_summary(events, frames)
+        print(f"[OK] perfil: {self.path} (chrome://tracing o ui.perfetto.dev)")
+
+
+def print_summary(events: list, frames: int) -> None:
+    """Taula per etapa: crides, total, mitjana, p95 i ms per frame."""
+    by_stage = {}
+    for _, name, t0, t1, _ in events:
+        by_stage.setdefault(name, []).append((t1 - t0) / 1e6)
+    print(f"\n{'etapa':<16} {'crides':>8} {'total s':>9} {'mitjana ms':>11} "
+          f"{'p95 ms':>9} {'ms/frame':>9}")
+    for name, ms in sorted(by_stage.items(), key=lambda kv: -sum(kv[1])):
+        ms = np.asarray(ms)
+        per_frame = f"{ms.sum() / frames:9.2f}" if frames else f"{'-':>9}"
+        print(f"{name:<16} {len(ms):>8} {ms.sum() / 1000:>9.2f} {ms.mean():>11.2f} "
+              f"{np.percentile(ms, 95):>9.2f} {per_frame}")
+    print(f"{frames} frames")
+
+
+def enable(path: Path) -> Profiler:
+    """Activa el perfil per a aquest procés (i els fills); es desa en sortir."""
+    global _PROFILER
+    if _PROFILER is None:
+        _PROFILER = Profiler(path)
+        os.register_at_fork(after_in_child=lambda: _PROFILER and _PROFILER._after_fork())
+        atexit.register(lambda: _PROFILER.save())
+    return _PROFILER
+
+
+def stage(name: str):
+    """Context que mesura l'etapa `name` (buit si el perfil no està actiu)."""
+    if _PROFILER is None:
+        return _NULL
+    return _Span(_PROFILER, name)
+
+
+def add_frames(n: int = 1) -> None:
+    """Compta `n` frames escrits (per al cost per frame del resum)."""
+    if _PROFILER is not None:
+        _PROFILER.frames += n
+
+
+def flush() -> None:
+    """Als processos fills: desa el que s'ha mesurat fins ara."""
+    if _PROFILER is not None:
+        _PROFILER.flush()
+
+
+class ProfileAction(argparse.Action):
+    """--profile TRACE.json: activa el perfil en llegir els arguments."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, values)
+        enable(Path(values))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# render_output.py
+"""
+Opcions de sortida comunes dels scripts make_* i escriptura del vídeo final.
+
+Backends:
+- moviepy: clip.write_videofile (comportament original)
+- pipe: ffmpeg_pipe.write_clip_pipe, rawvideo directe a ffmpeg
+- ffmpeg: en seqüències Ken Burns, tot el moviment dins d'ffmpeg
+  (ffmpeg_kenburns.py), sense Python per frame; a make_overlay.py, el loop
+  i la fusió de l'overlay dins d'ffmpeg (ffmpeg_overlay.py)
+
+--draft (apply_draft) fa una previsualització ràpida amb la mateixa línia
+de temps: resolució reduïda, remostreig bilineal, fps limitat i preset
+ultrafast.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from PIL import Image
+
+from ffmpeg_kenburns import write_kenburns_ffmpeg
+from ffmpeg_pipe import write_clip_pipe
+from image_cache import DEFAULT_MAX_IMAGES, set_cache_size
+from ingest import add_ingest_args, ingest_from_args
+from kenburns_engine import concatenate_clips, ken_burns_clip, timeline_frames
+from parallel_render import write_videofile_parallel
+from profiling import ProfileAction, add_frames
+from segment_cache import segment_paths
+from segment_render import SEGMENT_FFMPEG_PARAMS, write_segments
+from static_frames import STATIC_MODES, static_spans, write_static
+
+BACKENDS = ("moviepy", "pipe")
+
+# --draft: escala de la resolució, fps màxim i preset de l'encoder
+DRAFT_SCALE = 0.5
+DRAFT_FPS = 15
+DRAFT_PRESET = "ultrafast"
+
+
+def add_output_args(ap: argparse.ArgumentParser, kenburns: bool = False,
+                    overlay: bool = False, segments: bool = False) -> None:
+    """
+    kenburns=True per als scripts que escriuen una seqüència Ken Burns
+    sense transicions (write_kenburns): hi afegeix --segments i el backend ffmpeg.
+    overlay=True afegeix el backend ffmpeg per a l'overlay de make_overlay.py.
+    segments=True només hi afegeix --segments (render per trams).
+    """
+    backends = BACKENDS + ("ffmpeg",) if kenburns or overlay else BACKENDS
+    help_ffmpeg = ""
+    if kenburns:
+        help_ffmpeg = " o ffmpeg (zoompan, sense Python per frame)"
+    elif overlay:
+        help_ffmpeg = " o ffmpeg (loop i blend de l'overlay dins d'ffmpeg)"
+    ap.add_argument("--backend", choices=backends, default="moviepy",
+                    help="moviepy (write_videofile), pipe (rawvideo directe a ffmpeg)"
+                         + help_ffmpeg)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Processos que calculen frames en paral·lel "
+                         "(1 = un sol procés)")
+    ap.add_argument("--batch", type=int, default=0,
+                    help="Frames per bloc amb l'API de blocs (mostreig bilineal "
+                         "vectoritzat amb prefiltre; la sortida no és idèntica a la "
+                         "del camí per frame, LANCZOS); 0 = un frame per crida")
+    ap.add_argument("--image-cache", type=int, default=DEFAULT_MAX_IMAGES,
+                    help="Màxim d'imatges Ken Burns descodificades en memòria "
+                         "alhora (per procés)")
+    ap.add_argument("--static", choices=STATIC_MODES, default="off",
+                    help="Trams on el frame no canvia (imatges fixes): es calculen "
+                         "una vegada i es repeteixen (repeat) o s'escriuen com un sol "
+                         "frame llarg (vfr)")
+    if kenburns:
+        ap.add_argument("--yuv", action="store_true",
+                        help="Amb --backend pipe: mostreja i envia els frames en yuv420p "
+                             "(la meitat de bytes, sense conversió a l'encoder)")
+    add_draft_args(ap)
+    if overlay:
+        ap.add_argument("--skip-overlay", action="store_true",
+                        help="No aplica l'overlay (útil amb --draft)")
+    ap.add_argument("--profile", metavar="TRACE.json", action=ProfileAction, default=None,
+                    help="Mesura cada etapa (descodificació, resize, composició, blend, "
+                         "pipe d'ffmpeg...) i en acabar escriu un Chrome trace i un resum")
+    ap.set_defaults(resample=Image.LANCZOS, oversample=2)
+    add_ingest_args(ap)
+    if kenburns or segments:
+        ap.add_argument("--segments", type=int, default=0,
+                        help="Codifica cada imatge (o tram de transició) com a segment "
+                             "independent, "
+                             "N alhora, i les uneix amb -c copy (0 = desactivat)")
+    if kenburns:
+        ap.add_argument("--segment-cache", default=None,
+                        help="Carpeta on es guarden els segments per imatge, amb clau "
+                             "pel contingut: en tornar a executar només es codifiquen "
+                             "els que han canviat o no es van acabar")
+
+
+def add_draft_args(ap: argparse.ArgumentParser) -> None:
+    """--preset, --draft i --draft-scale (també per a scripts sense add_output_args)."""
+    ap.add_argument("--preset", default="medium",
+                    help="Preset de l'encoder (x264)")
+    ap.add_argument("--draft", action="store_true",
+                    help=f"Previsualització ràpida amb la mateixa línia de temps: "
+                         f"resolució x{DRAFT_SCALE:g}, remostreig bilineal, "
+                         f"com a molt {DRAFT_FPS} fps i preset {DRAFT_PRESET}")
+    ap.add_argument("--draft-scale", type=float, default=DRAFT_SCALE,
+                    help="Escala de la resolució amb --draft")
+
+
+def _even(x: float) -> int:
+    return max(2, int(round(x / 2)) * 2)
+
+
+def apply_draft(args: argparse.Namespace, size: tuple[str, ...] = ("width", "height"),
+                fps: str | None = "fps") -> None:
+    """
+    Amb --draft, redueix in-place les opcions de `args`: els atributs de mida
+    `size` (per --draft-scale, parells), l'atribut `fps` (fins a DRAFT_FPS),
+    el preset i el remostreig. Les durades no es toquen: la línia de temps
+    és la mateixa que la del render final.
+    """
+    if not args.draft:
+        return
+    for name in size:
+        if getattr(args, name, None) is not None:
+            setattr(args, name, _even(getattr(args, name) * args.draft_scale))
+    if fps is not None:
+        setattr(args, fps, min(getattr(args, fps), DRAFT_FPS))
+    args.preset = DRAFT_PRESET
+    args.resample = Image.BILINEAR
+    args.oversample = 1
+    dims = "x".join(str(getattr(args, n)) for n in size if getattr(args, n, None) is not None)
+    print(f"[OK] draft: {dims or 'mida original'}"
+          f"{f', {getattr(args, fps)} fps' if fps else ''}, preset {DRAFT_PRESET}")
+
+
+def write_clip(clip, out, fps: float, backend: str = "moviepy",
+               workers: int = 1, codec: str = "libx264", batch: int = 0,
+               writer_args: dict | None = None, static: str = "off",
+               preset: str = "medium", yuv: bool = False) -> None:
+    """
+    Escriu `clip` a `out` sense àudio amb el backend indicat. Amb
+    `writer_args` (entrades/filtres extra d'ffmpeg) sempre es fa per pipe.
+    Amb static != "off" i trams estàtics coneguts, cada tram es calcula una
+    sola vegada (static_frames.py).
+    """
+    if static != "off" and static_spans(clip):
+        # l'overlay d'ffmpeg (writer_args) ha de veure tots els frames: només CFR
+        mode = "repeat" if writer_args else static
+        write_static(clip, str(out), fps, mode=mode, codec=codec, preset=preset,
+                     batch=batch, writer_args=writer_args)
+    elif workers > 1:
+        write_videofile_parallel(clip, str(out), fps, workers, codec=codec,
+                                 chunk=max(8, batch), preset=preset, batch=batch > 0,
+                                 writer_args=writer_args)
+    elif backend == "pipe" or writer_args:
+        write_clip_pipe(clip, str(out), fps, codec=codec, preset=preset, batch=batch,
+                        writer_args=writer_args, yuv=yuv)
+    else:
+        clip.write_videofile(str(out), fps=fps, codec=codec, preset=preset, audio=False)
+        add_frames(int(clip.duration * fps))
+
+
+def write_video(clip, out, fps: float, args: argparse.Namespace,
+                codec: str = "libx264", writer_args: dict | None = None) -> None:
+    """Escriu `clip` a `out` segons les opcions de la CLI."""
+    set_cache_size(args.image_cache)
+    write_clip(clip, out, fps, backend=args.backend, workers=args.workers, codec=codec,
+               batch=args.batch, writer_args=writer_args, static=args.static,
+               preset=args.preset, yuv=getattr(args, "yuv", False))
+
+
+def write_sequence(clips, out, fps: float, args: argparse.Namespace,
+                   codec: str = "libx264") -> None:
+    """Escriu una seqüència de clips independents (sense transicions)."""
+    if getattr(args, "segments", 0) > 0:
+        set_cache_size(args.image_cache)
+        write_segments(clips, out, fps, args.segments, codec=codec,
+                       backend=args.backend, batch=args.batch, preset=args.preset,
+                       yuv=getattr(args, "yuv", False))
+        return
+    write_video(concatenate_clips(clips), out, fps, args, codec=codec)
+
+
+def write_kenburns(specs: list[dict], out, fps: float, out_w: int, out_h: int,
+                   args: argparse.Namespace, codec: str = "libx264") -> None:
+    """
+    Escriu una seqüència Ken Burns sense transicions.
+    `specs`: un dict per imatge amb img_path, duration, z0, z1 i mode.
+    """
+    if getattr(args, "ingest", False):
+        # sense retall: el moviment (p. ex. el pan tiktok) pot sortir del cover
+        headroom = max(max(s["z0"], s["z1"]) for s in specs)
+        paths = ingest_from_args(args, [s["img_path"] for s in specs], out_w, out_h,
+                                 headroom=headroom, crop=False)
+        specs = [dict(s, img_path=p) for s, p in zip(specs, paths)]
+    cached = None
+    if args.segment_cache:
+        # tot el que canvia els píxels o l'encoder forma part de la clau
+        frames = timeline_frames([s["duration"] for s in specs], fps)
+        cached = segment_paths(specs, args.segment_cache, frames, fps=fps, size=(out_w, out_h),
+                               codec=codec, preset=args.preset, backend=args.backend,
+                               bilinear=args.backend != "ffmpeg" and args.batch > 0,
+                               yuv=args.backend == "pipe" and args.yuv,
+                               resample=args.resample, oversample=args.oversample,
+                               params=SEGMENT_FFMPEG_PARAMS)
+    if args.backend == "ffmpeg":
+        jobs = max(1, args.segments, args.workers)
+        write_kenburns_ffmpeg(specs, out, fps, out_w, out_h, jobs=jobs, codec=codec,
+                              preset=args.preset, oversample=args.oversample,
+                              cached=cached)
+        return
+    clips = [ken_burns_clip(out_w=out_w, out_h=out_h, resample=args.resample, **spec)
+             for spec in specs]
+    if cached:
+        set_cache_size(args.image_cache)
+        write_segments(clips, out, fps, max(1, args.segments), codec=codec,
+                       backend=args.backend, batch=args.batch, preset=args.preset,
+                       yuv=args.yuv, cached=cached)
+        return
+    write_sequence(clips, out, fps, args, codec=codec)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# scene_detect.py
+"""
+Detección de cambios de plano para extract_frames --scenes.
+
+Cada frame se reduce a una firma pequeña en escala de grises (SIGNATURE_WIDTH
+de ancho) y el análisis se hace por lotes de frames con numpy: diferencia
+media de píxeles e histograma entre frames consecutivos. La puntuación de
+corte es la media de las dos (0 = igual, 1 = todo distinto); la diferencia
+de píxeles detecta cortes entre planos parecidos y el histograma evita que
+el movimiento dentro de un plano cuente como corte.
+
+De cada plano solo se guarda un frame a resolución completa: el primero o
+el más nítido (varianza del laplaciano de la firma).
+"""
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+SIGNATURE_WIDTH = 64
+HIST_BINS = 32
+DEFAULT_THRESHOLD = 0.3
+DEFAULT_MIN_LEN = 0.5
+DEFAULT_BATCH = 16
+PICKS = ("first", "sharpest")
+
+
+@dataclass
+class Shot:
+    """Un plano: frame e instante de inicio, puntuación del corte y frame elegido."""
+    start_idx: int
+    start_t: float
+    score: float
+    idx: int = 0
+    t: float = 0.0
+    sharpness: float = -1.0
+    end_t: float | None = None
+
+
+def signatures(frames: list[np.ndarray]) -> np.ndarray:
+    """Frames BGR -> (N, h, SIGNATURE_WIDTH) uint8 en escala de grises."""
+    h, w = frames[0].shape[:2]
+    size = (SIGNATURE_WIDTH, max(1, round(SIGNATURE_WIDTH * h / w)))
+    return np.stack([cv2.resize(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), size,
+                                interpolation=cv2.INTER_AREA)
+                     for f in frames])
+
+
+def cut_scores(sigs: np.ndarray) -> np.ndarray:
+    """Puntuación de corte entre cada par de firmas consecutivas: (N-1,) en [0, 1]."""
+    s = sigs.astype(np.int16)
+    pixel = np.abs(s[1:] - s[:-1]).mean(axis=(1, 2)) / 255
+
+    n, npix = len(sigs), sigs[0].size
+    bins = (sigs.reshape(n, -1).astype(np.int32) * HIST_BINS) >> 8
+    bins += np.arange(n, dtype=np.int32)[:, None] * HIST_BINS
+    hist = np.bincount(bins.ravel(), minlength=n * HIST_BINS).reshape(n, HIST_BINS)
+    hist = np.abs(hist[1:] - hist[:-1]).sum(axis=1) / (2 * npix)
+    return (pixel + hist) / 2
+
+
+def sharpness(sigs: np.ndarray) -> np.ndarray:
+    """Varianza del laplaciano de cada firma (más alta = más nítida)."""
+    s = sigs.astype(np.float32)
+    lap = (s[:, :-2, 1:-1] + s[:, 2:, 1:-1] + s[:, 1:-1, :-2] + s[:, 1:-1, 2:]
+           - 4 * s[:, 1:-1, 1:-1])
+    return lap.reshape(len(s), -1).var(axis=1)
+
+
+def detect_scenes(source, shots: list[Shot], threshold: float = DEFAULT_THRESHOLD,
+                  pick: str = "first", min_len: float = DEFAULT_MIN_LEN,
+                  batch: int = DEFAULT_BATCH):
+    """
+    Consume `source` ((índice, segundos, frame) en orden) y produce solo el
+    frame elegido de cada plano. Los planos se añaden a `shots`; un corte a
+    menos de `min_len` segundos del anterior se ignora (destellos).
+    """
+    if pick not in PICKS:
+        raise ValueError(f"pick debe ser uno de {PICKS}")
+    prev = None
+    best = None   # (índice, segundos, frame) elegido del plano actual (modo sharpest)
+    last_t = None
+    items = []
+
+    def process(items):
+        nonlocal prev, best
+        sigs = signatures([f for _, _, f in items])
+        scores = cut_scores(sigs if prev is None else np.concatenate([prev, sigs]))
+        if prev is None:
+            scores = np.concatenate([[1.0], scores])
+        sharp = sharpness(sigs) if pick == "sharpest" else None
+        prev = sigs[-1:]
+        for k, (idx, t, frame) in enumerate(items):
+            if not shots or (scores[k] >= threshold and t - shots[-1].start_t >= min_len):
+                if shots:
+                    shots[-1].end_t = t
+                    if best is not None:
+                        yield best
+                shots.append(Shot(idx, t, float(scores[k]) if len(shots) else 0.0, idx, t))
+                best = None
+                if pick == "first":
+                    yield idx, t, frame
+            if pick == "sharpest" and sharp[k] > shots[-1].sharpness:
+                shot = shots[-1]
+                shot.idx, shot.t, shot.sharpness = idx, t, float(sharp[k])
+                best = (idx, t, frame)
+
+    for item in source:
+        items.append(item)
+        last_t = item[1]
+        if len(items) == batch:
+            yield from process(items)
+            items = []
+    if items:
+        yield from process(items)
+    if best is not None:
+        yield best
+    if shots:
+        shots[-1].end_t = last_t
+
+
+def write_cuts_csv(path: Path, shots: list[Shot], names: list[str]) -> None:
+    """
+    CSV con una fila por plano: inicio, fin (inicio del siguiente o último
+    frame), puntuación del corte y fichero guardado.
+    """
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["scene", "start_frame", "start_s", "end_s", "score", "image"])
+        for i, (shot, name) in enumerate(zip(shots, names)):
+            w.writerow([i, shot.start_idx, f"{shot.start_t:.3f}",
+                        "" if shot.end_t is None else f"{shot.end_t:.3f}",
+                        f"{shot.score:.3f}", name])
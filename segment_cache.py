@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# segment_cache.py
+"""
+Cache persistent de segments Ken Burns ja codificats.
+
+Cada segment (una imatge de la seqüència) té com a clau el hash de tot el
+que el determina: el contingut de la imatge, durada, z0/z1, mode, fps,
+resolució, codec, paràmetres de render i la seva posició a la línia de
+temps (instant d'inici, primer frame i nombre de frames: si canvia una
+durada anterior, els segments següents es desplacen). Els segments es guarden al
+directori de cache amb aquesta clau i el vídeo final s'uneix amb
+concat -c copy (segment_render.concat_copy).
+
+Així, si només canvia una imatge (o una durada), només es codifica aquell
+segment; i si un render s'interromp, el següent reprèn des dels segments
+que ja s'havien acabat. Cada segment s'escriu a un temporal i es renombra
+en acabar, de manera que un segment a mitges mai compta com a fet.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from frame_store import source_hash
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "segment_cache"
+
+# s'incrementa quan canvia el render d'un segment amb les mateixes entrades
+SEGMENT_CACHE_VERSION = 2
+
+
+def segment_key(spec: dict, image_hash: str | None = None, **settings) -> str:
+    """Clau d'un segment: hash de la imatge, del spec i de `settings` (fps, mida, codec...)."""
+    params = {k: v for k, v in spec.items() if k != "img_path"}
+    params.update(settings, version=SEGMENT_CACHE_VERSION)
+    h = hashlib.sha256()
+    h.update((image_hash or source_hash(spec["img_path"])).encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:32]
+
+
+def segment_paths(specs: list[dict], cache_dir: Path | None = None,
+                  frames: list[tuple[int, int]] | None = None, **settings) -> list[Path]:
+    """
+    Ruta al cache del segment de cada spec (existeixi o no). `frames`: el
+    rang [i0, i1) de cada spec a la línia de temps (timeline_frames).
+    """
+    starts = np.cumsum([0.0] + [s["duration"] for s in specs])
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    hashes = {}
+    paths = []
+    for k, spec in enumerate(specs):
+        src = spec["img_path"]
+        if src not in hashes:
+            hashes[src] = source_hash(src)
+        if frames is not None:
+            i0, i1 = frames[k]
+            settings.update(start=round(float(starts[k]), 9), start_frame=i0,
+                            n_frames=i1 - i0)
+        paths.append(cache_dir / f"{segment_key(spec, hashes[src], **settings)}.mp4")
+    return paths
+
+
+def pending(segments: list[Path]) -> list[int]:
+    """Índexs dels segments que cal codificar (un per ruta, si es repeteix)."""
+    todo, seen = [], set()
+    for i, seg in enumerate(segments):
+        if seg not in seen and not seg.exists():
+            todo.append(i)
+        seen.add(seg)
+    return todo
+
+
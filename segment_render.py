@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# segment_render.py
+"""
+Codificació per segments: quan els clips d'una seqüència són independents
+(sense transicions entre imatges), cada clip es codifica com a segment propi
+amb els mateixos paràmetres d'encoder, N alhora, i el resultat s'uneix amb
+el concat demuxer d'ffmpeg i `-c copy` (sense re-codificar).
+
+Amb transicions, write_spans parteix la línia de temps en trams (un sol
+clip o solapament) i codifica cada tram per separat: només els trams
+solapats necessiten composició.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import shlex
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from moviepy import VideoClip
+
+from ffmpeg_pipe import FFmpegPipeWriter, write_clip_pipe
+from kenburns_engine import (get_frame_block, get_yuv_block, timeline_frames,
+                             with_frame_block, with_yuv_block)
+from profiling import add_frames, flush, stage
+from file_utils import atomic_output
+from segment_cache import pending
+
+# paràmetres fixos perquè tots els segments siguin compatibles amb -c copy
+SEGMENT_FFMPEG_PARAMS = ["-pix_fmt", "yuv420p"]
+
+# clips que codifiquen els workers (heretats pel fork)
+_CLIPS = None
+
+
+def run(cmd: list[str]) -> None:
+    print(">", " ".join(shlex.quote(c) for c in cmd))
+    p = subprocess.run(cmd, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise SystemExit(p.stderr.strip() or f"ffmpeg falló (code={p.returncode})")
+
+
+def concat_copy(segments: list[Path], out: Path,
+                durations: list[float] | None = None) -> None:
+    """
+    Uneix segments ja codificats amb el concat demuxer, sense re-codificar.
+    Amb `durations`, cada segment dura exactament això (p. ex. un sol frame
+    que es manté en pantalla: sortida VFR).
+    """
+    out = Path(out)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", dir=out.parent,
+                                     delete=False, encoding="utf-8") as f:
+        for i, seg in enumerate(segments):
+            f.write(f"file {Path(seg).resolve().as_posix()!r}\n")
+            if durations is not None:
+                f.write(f"duration {durations[i]:.6f}\n")
+        list_path = Path(f.name)
+    try:
+        with stage("concat"):
+            run([
+                "ffmpeg", "-y",
+                "-hide_banner", "-loglevel", "error",
+                "-f", "concat", "-safe", "0",
+                "-i", str(list_path),
+                "-c", "copy",
+                "-movflags", "+faststart",
+                str(out),
+            ])
+    finally:
+        list_path.unlink(missing_ok=True)
+
+
+def _run(encode, tasks, jobs: int) -> None:
+    """Executa `encode(task)` per a cada tasca, `jobs` processos alhora (fork)."""
+    if jobs > 1 and "fork" in mp.get_all_start_methods():
+        with mp.get_context("fork").Pool(jobs) as pool:
+            for n, i in enumerate(pool.imap_unordered(encode, tasks), 1):
+                print(f"  segment {i + 1}/{len(tasks)} ({n} fets)")
+    else:
+        for task in tasks:
+            encode(task)
+
+
+def timeline_clip(clip, start: float, i0: int, i1: int, fps: float) -> VideoClip:
+    """
+    Els frames [i0, i1) de la línia de temps global (t = i / fps) de `clip`,
+    que hi comença a `start`: el frame j del resultat és clip a
+    (i0 + j) / fps - start, els mateixos instants que concatenate_clips.
+    Conserva les API de blocs.
+    """
+    def local(t):
+        return (i0 + np.rint(np.asarray(t, dtype=float) * fps)) / fps - start
+
+    sub = VideoClip(duration=(i1 - i0 + 0.5) / fps)   # int(duration * fps) == i1 - i0
+    sub.frame_function = lambda t: clip.get_frame(float(local(t)))
+    sub.size = clip.size
+    sub.prefetch = getattr(clip, "prefetch", None)
+    yuv_block = get_yuv_block(clip)
+    if yuv_block is not None:
+        with_yuv_block(sub, lambda ts: yuv_block(local(ts)))
+    frame_block = get_frame_block(clip)
+    if frame_block is not None:
+        with_frame_block(sub, lambda ts: frame_block(local(ts)))
+    return sub
+
+
+def _encode_segment(task):
+    i, path, fps, start, i0, i1, codec, preset, ffmpeg_params, backend, batch, yuv = task
+    clip = timeline_clip(_CLIPS[i], start, i0, i1, fps)
+    with atomic_output(path) as tmp:
+        if backend == "pipe":
+            write_clip_pipe(clip, tmp, fps, codec=codec, preset=preset,
+                            ffmpeg_params=ffmpeg_params, batch=batch, yuv=yuv)
+        else:
+            clip.write_videofile(str(tmp), fps=fps, codec=codec, preset=preset,
+                                 audio=False, ffmpeg_params=ffmpeg_params, logger=None)
+            add_frames(i1 - i0)
+    flush()
+    return i
+
+
+def write_segments(clips, out, fps: float, jobs: int,
+                   codec: str = "libx264",
+                   ffmpeg_params: list[str] | None = None,
+                   backend: str = "moviepy", batch: int = 0,
+                   preset: str = "medium", yuv: bool = False,
+                   cached: list[Path] | None = None) -> None:
+    """
+    Equivalent a concatenate_videoclips(clips).write_videofile(out, ...)
+    per a clips independents, amb `jobs` segments codificant-se alhora.
+    Cada segment té els frames del seu clip a la línia de temps global
+    (timeline_frames): el total i els talls són els del vídeo sencer, també
+    amb durades fraccionàries. Un clip sense cap frame no té segment.
+    Amb `cached` (rutes del segment_cache, una per clip) només es codifiquen
+    els segments que encara no hi són.
+    """
+    global _CLIPS
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    params = SEGMENT_FFMPEG_PARAMS + list(ffmpeg_params or [])
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix=f".{out.stem}_seg_", dir=out.parent) as tmp:
+        durations = [c.duration for c in clips]
+        starts = np.cumsum([0.0] + durations)
+        frames = timeline_frames(durations, fps)
+        segments = cached or [Path(tmp) / f"seg_{i:05d}.mp4" for i in range(len(clips))]
+        tasks = [(i, segments[i], fps, starts[i], *frames[i], codec, preset, params,
+                  backend, batch, yuv)
+                 for i in pending(segments) if frames[i][1] > frames[i][0]]
+
+        _CLIPS = clips
+        try:
+            _run(_encode_segment, tasks, jobs)
+        finally:
+            _CLIPS = None
+
+        t1 = time.perf_counter()
+        concat_copy([seg for seg, (i0, i1) in zip(segments, frames) if i1 > i0], out)
+
+    t2 = time.perf_counter()
+    print(f"[OK] {out}: {len(clips)} segments ({len(tasks)} codificats) en "
+          f"{t1 - t0:.1f}s, concat en {t2 - t1:.1f}s")
+
+
+# ---------------------------
+# Render per trams (smart rendering)
+# ---------------------------
+
+def plan_spans(starts: list[float], ends: list[float], fps: float) -> list[tuple[int, int, int]]:
+    """
+    Parteix els frames t = i / fps de la línia de temps pels límits
+    start/end dels clips: (i0, i1, clips actius) per a cada tram no buit.
+    Els trams amb un sol clip no necessiten composició.
+    """
+    n_frames = int(max(ends) * fps)
+    ts = np.arange(n_frames) / fps
+    bounds = np.unique(list(starts) + list(ends))
+    idx = np.searchsorted(ts, bounds)
+
+    spans = []
+    for k in range(len(bounds) - 1):
+        i0, i1 = int(idx[k]), int(idx[k + 1])
+        if i1 > i0:
+            t = bounds[k]
+            active = sum(1 for s, e in zip(starts, ends) if s <= t < e)
+            spans.append((i0, i1, active))
+    return spans
+
+
+def _encode_span(task):
+    k, path, fps, i0, i1, codec, preset, ffmpeg_params, batch = task
+    clip = _CLIPS[0]
+    frame_block = get_frame_block(clip) if batch > 0 else None
+    with FFmpegPipeWriter(path, clip.size, fps, codec=codec, preset=preset,
+                          ffmpeg_params=ffmpeg_params) as writer:
+        if frame_block is not None:
+            for j in range(i0, i1, batch):
+                with stage("frame_block"):
+                    block = frame_block(np.arange(j, min(j + batch, i1)) / fps)
+                writer.write_frames(block)
+        else:
+            for j in range(i0, i1):
+                with stage("frame"):
+                    frame = clip.get_frame(j / fps)
+                writer.write_frame(frame)
+    flush()
+    return k
+
+
+def write_spans(clip, spans: list[tuple[int, int, int]], out, fps: float, jobs: int,
+                codec: str = "libx264", ffmpeg_params: list[str] | None = None,
+                batch: int = 0, preset: str = "medium") -> None:
+    """
+    Codifica els frames [i0, i1) de cada tram de `clip` com a segment propi
+    (cada un comença amb un keyframe), `jobs` alhora, i els uneix amb -c copy.
+    El resultat té exactament els mateixos frames que codificar el clip sencer.
+    """
+    global _CLIPS
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    params = SEGMENT_FFMPEG_PARAMS + list(ffmpeg_params or [])
+    overlaps = sum(1 for _, _, active in spans if active > 1)
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix=f".{out.stem}_span_", dir=out.parent) as tmp:
+        segments = [Path(tmp) / f"span_{k:05d}.mp4" for k in range(len(spans))]
+        # els trams llargs primer: millor repartiment entre processos
+        order = sorted(range(len(spans)), key=lambda k: spans[k][0] - spans[k][1])
+        tasks = [(k, segments[k], fps, spans[k][0], spans[k][1], codec, preset, params,
+                  batch)
+                 for k in order]
+
+        _CLIPS = [clip]
+        try:
+            _run(_encode_span, tasks, jobs)
+        finally:
+            _CLIPS = None
+
+        t1 = time.perf_counter()
+        concat_copy(segments, out)
+
+    t2 = time.perf_counter()
+    n_frames = spans[-1][1] - spans[0][0] if spans else 0
+    print(f"[OK] {out}: {n_frames} frames en {len(spans)} trams "
+          f"({overlaps} amb composició) en {t1 - t0:.1f}s, concat en {t2 - t1:.1f}s")
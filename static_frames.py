@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# static_frames.py
+"""
+Trams estàtics: intervals on el frame d'un clip no canvia, deduïts de les
+metadades dels clips (mai comparant píxels).
+
+- Un ImageClip sense efectes (i sense màscara animada) és estàtic sencer.
+- Un clip pot declarar els seus trams amb mark_static; com amb
+  kenburns_engine.with_frame_block, la marca només val mentre el clip
+  conservi el mateix frame_function (un efecte de MoviePy la invalida).
+- compositor.composite_clips marca els trams on tots els clips actius són
+  estàtics i no es mouen.
+
+Cada tram estàtic es calcula una sola vegada i s'escriu repetit (CFR) o com
+un únic frame que dura tot el tram (VFR, concat demuxer amb durations).
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from moviepy import ImageClip, VideoClip
+
+from ffmpeg_pipe import FFmpegPipeWriter
+from kenburns_engine import get_frame_block
+from profiling import stage
+from segment_render import SEGMENT_FFMPEG_PARAMS, concat_copy
+
+STATIC_MODES = ("off", "repeat", "vfr")
+
+_CONST_POS = None
+
+
+def mark_static(clip, spans: list[tuple[float, float]]):
+    """Declara que el frame de `clip` és constant dins de cada [t0, t1) (temps del clip)."""
+    clip.static_spans = list(spans)
+    clip.static_of = clip.frame_function
+    return clip
+
+
+def static_spans(clip) -> list[tuple[float, float]]:
+    """Trams [t0, t1) (temps del clip) on el frame és constant."""
+    spans = getattr(clip, "static_spans", None)
+    if spans is not None and getattr(clip, "static_of", None) is clip.frame_function:
+        return spans
+    # ImageClip.transform (efectes animats) converteix el clip en VideoClip
+    if isinstance(clip, ImageClip) and clip.duration is not None:
+        if clip.mask is None or isinstance(clip.mask, ImageClip):
+            return [(0.0, clip.duration)]
+    return []
+
+
+def has_constant_position(clip) -> bool:
+    """Posició per defecte o fixada amb with_position(constant), no una funció de t."""
+    global _CONST_POS
+    if _CONST_POS is None:
+        probe = VideoClip()
+        _CONST_POS = {probe.pos.__code__, probe.with_position((0, 0)).pos.__code__}
+    return getattr(clip.pos, "__code__", None) in _CONST_POS
+
+
+def is_static_during(clip, t0: float, t1: float) -> bool:
+    """El clip no canvia ni es mou dins de [t0, t1) (temps del clip)."""
+    if not has_constant_position(clip):
+        return False
+    return any(a <= t0 and t1 <= b for a, b in static_spans(clip))
+
+
+def frame_runs(clip, fps: float) -> list[tuple[int, int, bool]]:
+    """
+    Frames t = i / fps agrupats en trams (i0, n, estàtic). Només es
+    consideren estàtics els trams d'almenys dos frames.
+    """
+    n_frames = int(clip.duration * fps)
+    ts = np.arange(n_frames) / fps
+    runs = []
+    i = 0
+    for a, b in sorted(static_spans(clip)):
+        i0 = max(i, int(np.searchsorted(ts, a)))
+        i1 = int(np.searchsorted(ts, b))
+        if i1 - i0 < 2:
+            continue
+        if i0 > i:
+            runs.append((i, i0 - i, False))
+        runs.append((i0, i1 - i0, True))
+        i = i1
+    if i < n_frames:
+        runs.append((i, n_frames - i, False))
+    return runs
+
+
+def _write_run(writer, clip, fps, i0, n, static, frame_block):
+    if static:
+        with stage("frame"):
+            frame = clip.get_frame(i0 / fps)
+        for _ in range(n):
+            writer.write_frame(frame)
+    elif frame_block is not None:
+        with stage("frame_block"):
+            block = frame_block(np.arange(i0, i0 + n) / fps)
+        writer.write_frames(block)
+    else:
+        for i in range(i0, i0 + n):
+            with stage("frame"):
+                frame = clip.get_frame(i / fps)
+            writer.write_frame(frame)
+
+
+def write_static(clip, filename, fps: float, mode: str = "repeat",
+                 codec: str = "libx264", preset: str = "medium",
+                 batch: int = 0, writer_args: dict | None = None) -> None:
+    """
+    Escriu `clip` calculant un sol frame per tram estàtic.
+    mode="repeat": sortida CFR, el frame es repeteix a la pipe.
+    mode="vfr": cada tram és un segment; els estàtics d'un sol frame que
+    dura tot el tram, units amb concat -c copy.
+    """
+    runs = frame_runs(clip, fps)
+    frame_block = get_frame_block(clip) if batch > 0 else None
+    n_frames = sum(n for _, n, _ in runs)
+    rendered = sum(1 if static else n for _, n, static in runs)
+
+    t0 = time.perf_counter()
+    if mode == "vfr":
+        out = Path(filename)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=f".{out.stem}_vfr_", dir=out.parent) as tmp:
+            if runs and runs[-1][2]:
+                # el contenidor dona 1/fps a l'últim frame: el repetim al final
+                # perquè la durada total sigui la mateixa que en CFR
+                i0, n, _ = runs.pop()
+                runs += [(i0, n - 1, True), (i0 + n - 1, 1, True)]
+            segments, durations = [], []
+            for k, (i0, n, static) in enumerate(runs):
+                seg = Path(tmp) / f"run_{k:05d}.mp4"
+                with FFmpegPipeWriter(seg, clip.size, fps, codec=codec, preset=preset,
+                                      ffmpeg_params=SEGMENT_FFMPEG_PARAMS) as writer:
+                    _write_run(writer, clip, fps, i0, 1 if static else n, static, frame_block)
+                segments.append(seg)
+                durations.append(n / fps)
+            concat_copy(segments, out, durations)
+        encoded = sum(1 if s else n for _, n, s in runs)
+    else:
+        with FFmpegPipeWriter(filename, clip.size, fps, codec=codec, preset=preset,
+                              **(writer_args or {})) as writer:
+            for i0, n, static in runs:
+                _write_run(writer, clip, fps, i0, n, static, frame_block)
+        encoded = n_frames
+    elapsed = time.perf_counter() - t0
+
+    print(f"[OK] {filename}: {n_frames} frames ({rendered} calculats, {encoded} codificats) "
+          f"en {elapsed:.1f}s ({n_frames / max(elapsed, 1e-9):.1f} fps)")
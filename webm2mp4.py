@@ -1,37 +1,27 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import argparse
-import subprocess
 from pathlib import Path
 
-def convert_folder(folder: Path):
+from batch_convert import PROFILES, add_batch_args, find_inputs, run_from_args
+
+PROFILE = PROFILES["webm2mp4"]
+
+def convert_folder(folder: Path, args=None) -> dict | None:
+    """Convierte los .webm de `folder` (opciones de batch_convert en `args`)."""
     if not folder.is_dir():
         print("La carpeta no existe")
-        return
-
-    webms = list(folder.glob("*.webm"))
-    if not webms:
+        return None
+    if not find_inputs([folder], PROFILE.exts, bool(getattr(args, "recursive", False))):
         print("No hay archivos .webm")
-        return
-
-    for webm in webms:
-        mp4 = webm.with_suffix(".mp4")
-        if mp4.exists():
-            print(f"Saltando (ya existe): {mp4.name}")
-            continue
-
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", str(webm),
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            str(mp4)
-        ]
-        subprocess.run(cmd, check=True)
-        print(f"Convertido: {webm.name} → {mp4.name}")
+        return None
+    return run_from_args(PROFILE, [folder], args)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--folder", required=True, help="Carpeta con archivos .webm")
+    add_batch_args(parser)
     args = parser.parse_args()
 
-    convert_folder(Path(args.folder))
+    convert_folder(Path(args.folder), args)
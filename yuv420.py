@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# yuv420.py
+"""
+Camí YUV 4:2:0 natiu per al Ken Burns.
+
+Cada nivell de la piràmide es converteix a YUV una sola vegada: pla Y a
+resolució completa i plans U, V a la meitat (mitjana de 2x2). Els frames es
+mostregen directament en aquests plans (Y a la mida de sortida, UV a la
+meitat) i s'envien a ffmpeg com a rawvideo yuv420p: 1,5 bytes per píxel en
+lloc de 3, la meitat de mostreig i cap conversió de color a l'encoder.
+
+La matriu és la que fa servir ffmpeg (swscale) per defecte en passar de
+rgb24 a yuv420p sense etiquetes de color: BT.601 de rang limitat. Així la
+sortida es veu igual que la del camí RGB.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def yuv_frame_size(w: int, h: int) -> int:
+    """Bytes d'un frame yuv420p de w x h (w, h parells)."""
+    return w * h + 2 * (w // 2) * (h // 2)
+
+
+def rgb_to_yuv420(rgb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (h, w, 3) uint8 RGB -> Y (h, w, 1) i UV (h/2, w/2, 2) uint8, en punt fix.
+    Amb mida senar, l'última fila/columna de croma fa la mitjana amb ella mateixa.
+    """
+    h, w = rgb.shape[:2]
+    c = rgb.astype(np.int32)
+    r, g, b = c[..., 0], c[..., 1], c[..., 2]
+    y = ((66 * r + 129 * g + 25 * b + 128) >> 8) + 16
+
+    # croma de la mitjana de cada quadre 2x2 (la conversió és lineal)
+    if h % 2 or w % 2:
+        c = np.pad(c, ((0, h % 2), (0, w % 2), (0, 0)), mode="edge")
+    c = (c[0::2, 0::2] + c[1::2, 0::2] + c[0::2, 1::2] + c[1::2, 1::2] + 2) >> 2
+    r, g, b = c[..., 0], c[..., 1], c[..., 2]
+    uv = np.empty(c.shape[:2] + (2,), dtype=np.uint8)
+    uv[..., 0] = ((-38 * r - 74 * g + 112 * b + 128) >> 8) + 128
+    uv[..., 1] = ((112 * r - 94 * g - 18 * b + 128) >> 8) + 128
+    return y.astype(np.uint8)[..., None], uv
+
+
+def pack_yuv420(y: np.ndarray, uv: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Blocs Y (N, h, w, 1) i UV (N, h/2, w/2, 2) -> (N, bytes) en l'ordre de
+    yuv420p (pla Y, pla U, pla V).
+    """
+    n, h, w = y.shape[:3]
+    hc, wc = uv.shape[1:3]
+    if out is None:
+        out = np.empty((n, yuv_frame_size(w, h)), dtype=np.uint8)
+    out[:, :h * w] = y.reshape(n, -1)
+    out[:, h * w:h * w + hc * wc] = uv[..., 0].reshape(n, -1)
+    out[:, h * w + hc * wc:] = uv[..., 1].reshape(n, -1)
+    return out